@@ -1,18 +1,257 @@
-import time
+import asyncio
+import atexit
+import contextlib
+import random
+import sys
+import threading
+import weakref
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from models import NO_RESULTS_MESSAGE
+
+if TYPE_CHECKING:
+    import httpx
+    from session_manager import Message
+
+# Marks the end of a prompt prefix that Anthropic should cache
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Answer when Claude asks for a tool but the caller passed no tool manager
+NO_TOOL_MANAGER_ANSWER = (
+    "I have tools available but cannot execute them without a tool manager."
+)
+
+# History beyond these bounds is compacted into a summary block
+MAX_TURNS = 6
+MAX_TOKENS = 8000
+# Characters of each older message kept in the summary
+SUMMARY_SNIPPET_CHARS = 200
+
+# Connection pool to api.anthropic.com, shared by all generators. Pooled
+# connections belong to the event loop that opened them, so each loop gets
+# its own pool, dropped along with the loop.
+_HTTP_LIMITS = {
+    "max_keepalive_connections": 20,
+    "max_connections": 100,
+    "keepalive_expiry": 30.0,
+}
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]"
+_http_clients = weakref.WeakKeyDictionary()
+
+# The Anthropic SDK (and httpx/pydantic behind it) is slow to import, so it
+# is loaded on first use; processes that never generate responses skip it
+_anthropic = None
+
+_runners = threading.local()
+
+# Retry backoff uses full jitter from its own PRNG so concurrent workers
+# that fail together do not retry in lockstep
+_rng = random.Random()
+MAX_RETRY_DELAY = 30.0
+
+
+def _backoff_delay(base_delay: float, attempt: int) -> float:
+    """Full-jitter exponential backoff delay for a retry attempt"""
+    return min(_rng.uniform(0, base_delay * (2**attempt)), MAX_RETRY_DELAY)
+
+
+def _get_anthropic():
+    """Import and return the anthropic module"""
+    global _anthropic
+    if _anthropic is None:
+        import anthropic
+
+        _anthropic = anthropic
+    return _anthropic
+
+
+def _get_runner() -> asyncio.Runner:
+    """Return this thread's persistent runner, creating it on first use"""
+    runner = getattr(_runners, "runner", None)
+    if runner is None:
+        runner = _runners.runner = asyncio.Runner()
+    return runner
+
+
+def _current_loop() -> asyncio.AbstractEventLoop:
+    """The running event loop, or else the one run_sync uses on this thread"""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return _get_runner().get_loop()
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """Return the current loop's keep-alive HTTP client, creating it on first use"""
+    loop = _current_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+
+        client = _http_clients[loop] = _get_anthropic().DefaultAsyncHttpxClient(
+            limits=httpx.Limits(**_HTTP_LIMITS), timeout=60.0
+        )
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the running loop's HTTP client (call on application shutdown)"""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on this thread's persistent event loop.
+
+    Pooled connections belong to the loop that opened them, so synchronous
+    callers reuse one loop instead of starting a fresh one per call.
+    """
+    return _get_runner().run(coro)
+
+
+@atexit.register
+def _close_http_client_at_exit() -> None:
+    with contextlib.suppress(Exception):
+        run_sync(close_http_client())
+
+
+def history_to_messages(
+    conversation_history: Optional[Sequence["Message"]],
+) -> List[Dict]:
+    """
+    Convert session history into prior message turns, so the history becomes
+    part of the cacheable message prefix instead of being inlined into the
+    system prompt.
+
+    Empty messages are dropped and consecutive messages from the same role
+    are merged, so turns alternate, open with the user and close with the
+    assistant, ready for the new query. The last assistant turn carries a
+    cache breakpoint.
+    """
+    if not conversation_history:
+        return []
+
+    messages: List[Dict] = []
+    for entry in conversation_history:
+        # An empty content block is rejected by the API
+        if not entry.content.strip():
+            continue
+        if messages and messages[-1]["role"] == entry.role:
+            messages[-1]["content"] += "\n\n" + entry.content
+        elif messages or entry.role == "user":
+            messages.append({"role": entry.role, "content": entry.content})
+
+    # A question left without an answer would run into the new query
+    if messages and messages[-1]["role"] == "user":
+        messages.pop()
+
+    if messages:
+        messages[-1]["content"] = [
+            {
+                "type": "text",
+                "text": messages[-1]["content"],
+                "cache_control": CACHE_CONTROL,
+            }
+        ]
+
+    return messages
+
+
+def _message_text(message: Dict) -> str:
+    """Plain text of a history message, whether string or text blocks"""
+    content = message["content"]
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+def _estimate_tokens(messages: List[Dict]) -> int:
+    """Rough token count (~4 characters per token)"""
+    return sum(len(_message_text(message)) for message in messages) // 4
+
 
-import anthropic
+def compact_history(messages: List[Dict]) -> Tuple[Optional[str], List[Dict]]:
+    """
+    Keep recent history verbatim and condense older turns into a summary.
+
+    While the history exceeds MAX_TURNS messages or MAX_TOKENS, the oldest
+    half is folded into the summary. The summary is built from a fixed
+    template, so it only changes when more turns are folded in and stays
+    byte-identical (and cacheable) otherwise.
+
+    Returns:
+        (summary text or None, remaining messages)
+    """
+    folded: List[Dict] = []
+    while len(messages) > 2 and (
+        len(messages) > MAX_TURNS or _estimate_tokens(messages) > MAX_TOKENS
+    ):
+        split = len(messages) // 2
+        # The kept window must open with a user turn
+        while split < len(messages) and messages[split]["role"] != "user":
+            split += 1
+        folded.extend(messages[:split])
+        messages = messages[split:]
+
+    if not folded:
+        return None, messages
+
+    lines = []
+    for message in folded:
+        text = " ".join(_message_text(message).split())
+        if len(text) > SUMMARY_SNIPPET_CHARS:
+            text = text[:SUMMARY_SNIPPET_CHARS] + "..."
+        lines.append(f"- {message['role'].title()}: {text}")
+    summary = "Summary of earlier conversation:\n" + "\n".join(lines)
+    return summary, messages
 
 
 @dataclass
 class RoundContext:
     """Manages conversation state across rounds"""
 
-    def __init__(self, initial_query: str, conversation_history: Optional[str] = None):
-        self.messages: List[Dict] = [{"role": "user", "content": initial_query}]
+    # Custom __init__ without dataclass fields, so slots are declared by hand
+    __slots__ = (
+        "history_summary",
+        "messages",
+        "round_number",
+        "conversation_history",
+        "force_final",
+        "sources",
+    )
+
+    def __init__(
+        self,
+        initial_query: str,
+        conversation_history: Optional[Sequence["Message"]] = None,
+        sources: Optional[List] = None,
+    ):
+        self.history_summary, self.messages = compact_history(
+            history_to_messages(conversation_history)
+        )
+        self.messages.append({"role": "user", "content": initial_query})
         self.round_number: int = 1
         self.conversation_history = conversation_history
+        # Set when further tool calls cannot help and the next round must answer
+        self.force_final: bool = False
+        # Receives the sources behind the answer, when the caller collects them
+        self.sources = sources
 
     def add_assistant_message(self, content):
         """Add assistant's response to message history"""
@@ -27,7 +266,22 @@ class RoundContext:
         self.round_number += 1
 
 
-@dataclass
+@dataclass(slots=True)
+class _FallbackBlock:
+    """Text block standing in for a response that could not be obtained"""
+
+    text: str
+    type: str = "text"
+
+
+@dataclass(slots=True)
+class _FallbackResponse:
+    """Minimal response shape used when an API round fails"""
+
+    content: List[_FallbackBlock]
+
+
+@dataclass(slots=True)
 class RoundResult:
     """Encapsulates results from a single round"""
 
@@ -37,17 +291,17 @@ class RoundResult:
     error: Optional[str] = None
 
     def get_text_content(self) -> str:
-        """Extract text content from response"""
-        if hasattr(self.response, "content") and self.response.content:
-            return self.response.content[0].text
+        """Extract the first text block from response; tool_use blocks have none"""
+        for block in getattr(self.response, "content", None) or ():
+            if block.type == "text":
+                return block.text
         return ""
 
 
-class AIGenerator:
-    """Handles interactions with Anthropic's Claude API for generating responses"""
-
-    # Static system prompt to avoid rebuilding on each call
-    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
+# Static system prompt, interned and shared by every request. It must stay
+# byte-identical for the prompt cache to hit, so no leading whitespace.
+SYSTEM_PROMPT = sys.intern(
+    """You are an AI assistant specialized in course materials and educational content with access to comprehensive tools for course information.
 
 Available Tools:
 1. **Course Content Search**: For questions about specific topics within course materials
@@ -90,37 +344,102 @@ All responses must be:
 4. **Example-supported** - Include relevant examples when they aid understanding
 Provide only the direct answer to what was asked.
 """
+)
+
+
+class AIGenerator:
+    """Handles interactions with Anthropic's Claude API for generating responses"""
+
+    # Byte-stable, cached leading system block
+    SYSTEM_BLOCK = {
+        "type": "text",
+        "text": SYSTEM_PROMPT,
+        "cache_control": CACHE_CONTROL,
+    }
+
+    # Short uncached suffix so round guidance never invalidates the prefix
+    ROUND_2_BLOCK = {
+        "type": "text",
+        "text": "ROUND 2: You have previous tool results available. Use them to make informed decisions about additional searches or provide a comprehensive final answer.",
+    }
 
     def __init__(self, api_key: str, model: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.api_key = api_key
+        # One SDK client per event loop, each on that loop's connection pool
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Built for the caller's loop up front, so a missing SDK fails here
+        # rather than on the first query
+        self._client_for(_current_loop())
         self.model = model
 
         # Pre-build base API parameters
         self.base_params = {"model": self.model, "temperature": 0, "max_tokens": 800}
 
-    def _make_api_call_with_retry(self, **api_params) -> Any:
+    @property
+    def client(self) -> Any:
+        """SDK client for the current event loop"""
+        return self._client_for(_current_loop())
+
+    def _client_for(self, loop: asyncio.AbstractEventLoop) -> Any:
+        """Return the SDK client for a loop, creating it on first use"""
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = _get_anthropic().AsyncAnthropic(
+                api_key=self.api_key, http_client=get_http_client()
+            )
+        return client
+
+    async def _make_api_call_with_retry(self, **api_params) -> Any:
         """
         Make API call with exponential backoff retry logic.
 
         Handles rate limiting (429), overloaded errors (529), and other transient failures.
         """
+        return await self._with_retry(lambda: self.client.messages.create(**api_params))
+
+    @contextlib.asynccontextmanager
+    async def _stream_with_retry(self, **api_params) -> AsyncIterator[Any]:
+        """
+        Open a message stream, retrying the request like
+        _make_api_call_with_retry. Only opening is retried: once events
+        flow, a failure would repeat text the caller already has.
+        """
+        manager: Any = None
+
+        async def open_stream():
+            nonlocal manager
+            # A stream manager sends its request once, so each attempt needs a new one
+            manager = self.client.messages.stream(**api_params)
+            return await manager.__aenter__()
+
+        response_stream = await self._with_retry(open_stream)
+        try:
+            yield response_stream
+        finally:
+            await manager.__aexit__(None, None, None)
+
+    async def _with_retry(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call(), retrying transient API failures with backoff"""
+        anthropic = _get_anthropic()
         max_retries = 3
         base_delay = 1  # Start with 1 second delay
 
         for attempt in range(max_retries + 1):
             try:
-                return self.client.messages.create(**api_params)
+                return await call()
 
             except anthropic.RateLimitError as e:
                 if attempt == max_retries:
                     raise RuntimeError(
                         "API rate limit exceeded after multiple retries. Please try again later."
                     ) from e
-                delay = base_delay * (2**attempt) + (time.time() % 1)  # Add jitter
+                delay = _backoff_delay(base_delay, attempt)
                 print(
                     f"Rate limit hit, retrying in {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries + 1})"
                 )
-                time.sleep(delay)
+                await asyncio.sleep(delay)
 
             except anthropic.APIStatusError as e:
                 if e.status_code in [
@@ -138,11 +457,11 @@ Provide only the direct answer to what was asked.
                             raise RuntimeError(
                                 f"Anthropic API is temporarily unavailable (status {e.status_code}). Please try again later."
                             ) from e
-                    delay = base_delay * (2**attempt) + (time.time() % 1)  # Add jitter
+                    delay = _backoff_delay(base_delay, attempt)
                     print(
                         f"API temporarily unavailable (status {e.status_code}), retrying in {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries + 1})"
                     )
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
                 else:
                     # For other status codes, don't retry
                     raise RuntimeError(f"API error: {str(e)}") from e
@@ -152,11 +471,11 @@ Provide only the direct answer to what was asked.
                     raise RuntimeError(
                         "Unable to connect to Anthropic API. Please check your internet connection."
                     ) from e
-                delay = base_delay * (2**attempt)
+                delay = _backoff_delay(base_delay, attempt)
                 print(
                     f"Connection error, retrying in {delay:.1f} seconds... (attempt {attempt + 1}/{max_retries + 1})"
                 )
-                time.sleep(delay)
+                await asyncio.sleep(delay)
 
             except Exception as e:
                 # For unexpected errors, don't retry
@@ -165,9 +484,132 @@ Provide only the direct answer to what was asked.
     def generate_response(
         self,
         query: str,
-        conversation_history: Optional[str] = None,
+        conversation_history: Optional[Sequence["Message"]] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        stream: bool = False,
+        sources: Optional[List] = None,
+    ) -> Union[str, Iterator[str]]:
+        """
+        Synchronous wrapper around agenerate_response for callers without
+        a running event loop (scripts, tests).
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            stream: Yield text chunks as they arrive instead of one string
+            sources: List that receives the sources behind the answer; the
+                tool manager must then provide execute_tool_with_sources
+
+        Returns:
+            Generated response as string, or an iterator of text chunks
+            when streaming
+        """
+        if stream:
+            return self._iter_sync(
+                self.astream_response(
+                    query, conversation_history, tools, tool_manager, sources
+                )
+            )
+
+        return run_sync(
+            self.agenerate_response(
+                query, conversation_history, tools, tool_manager, sources
+            )
+        )
+
+    @staticmethod
+    def _iter_sync(chunks: AsyncIterator[str]) -> Iterator[str]:
+        """Drive an async iterator from synchronous code on this thread's loop"""
+
+        async def next_chunk():
+            return await chunks.__anext__()
+
+        while True:
+            try:
+                yield run_sync(next_chunk())
+            except StopAsyncIteration:
+                return
+
+    async def astream_response(
+        self,
+        query: str,
+        conversation_history: Optional[Sequence["Message"]] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+        sources: Optional[List] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response like agenerate_response, yielding the answer as
+        text chunks while it is generated.
+
+        Every round is streamed. A round that may still end in tool_use
+        holds its text until stop_reason shows whether it is the answer or
+        a preamble to tool calls, so only the answer is yielded; the round
+        that can no longer call tools streams straight through.
+
+        An error before any text is reported as apology text, as
+        agenerate_response does. After partial output it is raised instead,
+        so the caller can tell the answer was cut short.
+        """
+        context = RoundContext(query, conversation_history, sources)
+        max_rounds = 2 if tools and tool_manager else 1
+        has_output = False
+
+        try:
+            while True:
+                hold = (
+                    bool(tools)
+                    and not context.force_final
+                    and not (tool_manager and context.round_number >= max_rounds)
+                )
+                held: List[str] = []
+                async with self._stream_with_retry(
+                    **self._build_api_params(context, tools)
+                ) as response_stream:
+                    async for text in response_stream.text_stream:
+                        if hold:
+                            held.append(text)
+                        else:
+                            has_output = True
+                            yield text
+                    response = await response_stream.get_final_message()
+
+                if response.stop_reason == "tool_use" and not tool_manager:
+                    yield NO_TOOL_MANAGER_ANSWER
+                    return
+
+                if (
+                    response.stop_reason != "tool_use"
+                    or context.round_number >= max_rounds
+                ):
+                    for text in held:
+                        has_output = True
+                        yield text
+                    return
+
+                round_result = RoundResult(response, has_tool_use=True)
+                if not await self._execute_tools_for_round(
+                    round_result, context, tool_manager
+                ):
+                    yield "I encountered an error while searching for information."
+                    return
+
+                context.increment_round()
+        except Exception as e:
+            if has_output:
+                raise
+            yield f"I apologize, but I encountered an error: {str(e)}"
+
+    async def agenerate_response(
+        self,
+        query: str,
+        conversation_history: Optional[Sequence["Message"]] = None,
         tools: Optional[List] = None,
         tool_manager=None,
+        sources: Optional[List] = None,
     ) -> str:
         """
         Generate AI response with optional tool usage and conversation context.
@@ -178,6 +620,8 @@ Provide only the direct answer to what was asked.
             conversation_history: Previous messages for context
             tools: Available tools the AI can use
             tool_manager: Manager to execute tools
+            sources: List that receives the sources behind the answer; the
+                tool manager must then provide execute_tool_with_sources
 
         Returns:
             Generated response as string
@@ -185,32 +629,28 @@ Provide only the direct answer to what was asked.
 
         # If no tools or tool manager, use single round logic
         if not tools or not tool_manager:
-            return self._generate_single_round_response(
+            return await self._generate_single_round_response(
                 query, conversation_history, tools
             )
 
         # Use sequential rounds for tool-enabled queries
-        return self._execute_sequential_rounds(
-            query, conversation_history, tools, tool_manager
+        return await self._execute_sequential_rounds(
+            query, conversation_history, tools, tool_manager, sources
         )
 
-    def _generate_single_round_response(
+    async def _generate_single_round_response(
         self,
         query: str,
-        conversation_history: Optional[str] = None,
+        conversation_history: Optional[Sequence["Message"]] = None,
         tools: Optional[List] = None,
     ) -> str:
         """Generate a single round response without tools (backward compatibility)"""
-        system_content = (
-            f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
-            if conversation_history
-            else self.SYSTEM_PROMPT
-        )
+        context = RoundContext(query, conversation_history)
 
         api_params = {
             **self.base_params,
-            "messages": [{"role": "user", "content": query}],
-            "system": system_content,
+            "messages": context.messages,
+            "system": self._build_system_prompt(context),
         }
 
         # Add tools if available (for cases where tools exist but no tool_manager)
@@ -218,30 +658,33 @@ Provide only the direct answer to what was asked.
             api_params["tools"] = tools
             api_params["tool_choice"] = {"type": "auto"}
 
-        response = self._make_api_call_with_retry(**api_params)
+        response = await self._make_api_call_with_retry(**api_params)
 
         # If tools were used but no tool manager, fall back to legacy behavior
         if response.stop_reason == "tool_use":
-            return (
-                "I have tools available but cannot execute them without a tool manager."
-            )
+            return NO_TOOL_MANAGER_ANSWER
 
         return response.content[0].text
 
-    def _execute_sequential_rounds(
-        self, query: str, conversation_history: Optional[str], tools: List, tool_manager
+    async def _execute_sequential_rounds(
+        self,
+        query: str,
+        conversation_history: Optional[Sequence["Message"]],
+        tools: List,
+        tool_manager,
+        sources: Optional[List] = None,
     ) -> str:
         """Execute up to 2 sequential rounds of tool calling"""
-        context = RoundContext(query, conversation_history)
+        context = RoundContext(query, conversation_history, sources)
         max_rounds = 2
 
         while context.round_number <= max_rounds:
             # Execute current round
-            round_result = self._execute_single_round(context, tools)
+            round_result = await self._execute_single_round(context, tools)
 
             # Execute tools if present
             if round_result.has_tool_use and tool_manager:
-                success = self._execute_tools_for_round(
+                success = await self._execute_tools_for_round(
                     round_result, context, tool_manager
                 )
                 if not success:
@@ -258,40 +701,23 @@ Provide only the direct answer to what was asked.
         # Return final response after max rounds
         return round_result.get_text_content()
 
-    def _execute_single_round(
+    async def _execute_single_round(
         self, context: RoundContext, tools: Optional[List] = None
     ) -> RoundResult:
         """Execute a single round of API call"""
         try:
-            # Build system prompt with conversation history if available
-            system_content = self._build_system_prompt(context)
-
-            # Prepare API parameters
-            api_params = {
-                **self.base_params,
-                "messages": context.messages,
-                "system": system_content,
-            }
-
-            # Add tools if available
-            if tools:
-                api_params["tools"] = tools
-                api_params["tool_choice"] = {"type": "auto"}
-
             # Make API call
-            response = self._make_api_call_with_retry(**api_params)
+            response = await self._make_api_call_with_retry(
+                **self._build_api_params(context, tools)
+            )
             has_tool_use = response.stop_reason == "tool_use"
 
             return RoundResult(response, has_tool_use, execution_success=True)
 
         except Exception as e:
             # Create fallback response for API errors
-            class MockResponse:
-                def __init__(self, text):
-                    self.content = [type("obj", (object,), {"text": text})()]
-
-            fallback_response = MockResponse(
-                f"I apologize, but I encountered an error: {str(e)}"
+            fallback_response = _FallbackResponse(
+                [_FallbackBlock(f"I apologize, but I encountered an error: {str(e)}")]
             )
             return RoundResult(
                 fallback_response,
@@ -300,6 +726,26 @@ Provide only the direct answer to what was asked.
                 error=str(e),
             )
 
+    def _build_api_params(
+        self, context: RoundContext, tools: Optional[List] = None
+    ) -> Dict[str, Any]:
+        """Build request parameters for the current round"""
+        api_params = {
+            **self.base_params,
+            "messages": context.messages,
+            "system": self._build_system_prompt(context),
+        }
+
+        # Add tools if available. Tools stay declared once the history holds
+        # tool_use blocks, so a forced final round disables them via tool_choice
+        if tools:
+            api_params["tools"] = tools
+            api_params["tool_choice"] = {
+                "type": "none" if context.force_final else "auto"
+            }
+
+        return api_params
+
     def _should_continue_rounds(
         self, round_num: int, round_result: RoundResult, max_rounds: int
     ) -> bool:
@@ -318,7 +764,7 @@ Provide only the direct answer to what was asked.
 
         return True
 
-    def _execute_tools_for_round(
+    async def _execute_tools_for_round(
         self, round_result: RoundResult, context: RoundContext, tool_manager
     ) -> bool:
         """Execute tools for current round and update context"""
@@ -326,26 +772,23 @@ Provide only the direct answer to what was asked.
             # Add assistant's response to context
             context.add_assistant_message(round_result.response.content)
 
-            # Execute all tool calls
-            tool_results = []
-            for content_block in round_result.response.content:
-                if content_block.type == "tool_use":
-                    result = tool_manager.execute_tool(
-                        content_block.name, **content_block.input
-                    )
-
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": result,
-                        }
-                    )
+            tool_results = await self._run_tool_calls(
+                round_result.response.content, tool_manager, context.sources
+            )
 
             # Add tool results to context
             if tool_results:
                 context.add_user_message(tool_results)
 
+                # Every search came back empty; another search round is
+                # unlikely to help, so the next round answers directly
+                if all(
+                    isinstance(result["content"], str)
+                    and result["content"].startswith(NO_RESULTS_MESSAGE)
+                    for result in tool_results
+                ):
+                    context.force_final = True
+
             return True
 
         except Exception as e:
@@ -360,21 +803,67 @@ Provide only the direct answer to what was asked.
             context.add_user_message(error_result)
             return False
 
-    def _build_system_prompt(self, context: RoundContext) -> str:
-        """Build system prompt with conversation history and round context"""
-        base_prompt = self.SYSTEM_PROMPT
+    async def _run_tool_calls(
+        self, content, tool_manager, sources: Optional[List] = None
+    ) -> List[Dict]:
+        """
+        Execute the tool_use blocks in a response and return tool_result
+        blocks. When sources is given, it is set to the sources of the last
+        call, in tool_use order, that found any.
+        """
+        # Execute all tool calls concurrently; searches block on the
+        # vector store, so each one runs in a worker thread
+        tool_blocks = [
+            content_block
+            for content_block in content
+            if content_block.type == "tool_use"
+        ]
+        execute = (
+            tool_manager.execute_tool
+            if sources is None
+            else tool_manager.execute_tool_with_sources
+        )
+        outputs = await asyncio.gather(
+            *(
+                asyncio.to_thread(execute, block.name, **block.input)
+                for block in tool_blocks
+            )
+        )
+
+        results = outputs
+        if sources is not None:
+            results = [result for result, _ in outputs]
+            # Picked by block order, not by which worker thread finished last
+            for _, call_sources in reversed(outputs):
+                if call_sources:
+                    sources[:] = call_sources
+                    break
+
+        # gather keeps submission order, so results follow the tool_use blocks
+        return [
+            {
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": result,
+            }
+            for block, result in zip(tool_blocks, results)
+        ]
+
+    def _build_system_prompt(self, context: RoundContext) -> List[Dict]:
+        """Build system blocks: cached static prompt plus round guidance"""
+        system = [self.SYSTEM_BLOCK]
 
-        # Add conversation history if available
-        if context.conversation_history:
-            base_prompt += f"\n\nPrevious conversation:\n{context.conversation_history}"
+        # Condensed older history sits right after the static prompt
+        if context.history_summary:
+            system.append({"type": "text", "text": context.history_summary})
 
         # Add round-specific guidance for round 2
         if context.round_number == 2:
-            base_prompt += "\n\nROUND 2: You have previous tool results available. Use them to make informed decisions about additional searches or provide a comprehensive final answer."
+            system.append(self.ROUND_2_BLOCK)
 
-        return base_prompt
+        return system
 
-    def _handle_tool_execution(
+    async def _handle_tool_execution(
         self, initial_response, base_params: Dict[str, Any], tool_manager
     ):
         """Legacy method for backward compatibility.
@@ -388,31 +877,16 @@ Provide only the direct answer to what was asked.
         Returns:
             Final response text after tool execution
         """
-        # Start with existing messages
-        messages = base_params["messages"].copy()
-
-        # Add AI's tool use response
-        messages.append({"role": "assistant", "content": initial_response.content})
-
-        # Execute all tool calls and collect results
-        tool_results = []
-        for content_block in initial_response.content:
-            if content_block.type == "tool_use":
-                tool_result = tool_manager.execute_tool(
-                    content_block.name, **content_block.input
-                )
-
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": content_block.id,
-                        "content": tool_result,
-                    }
-                )
+        tool_results = await self._run_tool_calls(
+            initial_response.content, tool_manager
+        )
 
-        # Add tool results as single message
+        # Extend the existing messages in a single allocation instead of
+        # copying them and appending turn by turn
+        new_messages = [{"role": "assistant", "content": initial_response.content}]
         if tool_results:
-            messages.append({"role": "user", "content": tool_results})
+            new_messages.append({"role": "user", "content": tool_results})
+        messages = base_params["messages"] + new_messages
 
         # Prepare final API call without tools
         final_params = {
@@ -422,5 +896,5 @@ Provide only the direct answer to what was asked.
         }
 
         # Get final response
-        final_response = self._make_api_call_with_retry(**final_params)
+        final_response = await self._make_api_call_with_retry(**final_params)
         return final_response.content[0].text
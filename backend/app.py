@@ -1,12 +1,14 @@
+import json
 import os
 import warnings
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from ai_generator import close_http_client
 from config import config
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from models import SourceObject
 from pydantic import BaseModel
@@ -58,6 +60,43 @@ class CourseStats(BaseModel):
     course_titles: List[str]
 
 
+def _http_error(error: Exception) -> HTTPException:
+    """Map a failure to an HTTP error with a user-friendly message"""
+    error_message = str(error).lower()
+
+    if "overloaded" in error_message:
+        return HTTPException(
+            status_code=503,
+            detail="The AI service is currently experiencing high demand. Please try again in a few minutes.",
+        )
+    elif "rate limit" in error_message:
+        return HTTPException(
+            status_code=429,
+            detail="Too many requests. Please wait a moment before trying again.",
+        )
+    elif "connection" in error_message:
+        return HTTPException(
+            status_code=503,
+            detail="Unable to connect to AI service. Please check your internet connection and try again.",
+        )
+    elif "api" in error_message:
+        return HTTPException(
+            status_code=502,
+            detail="AI service is temporarily unavailable. Please try again later.",
+        )
+    else:
+        # Generic error for unknown issues
+        return HTTPException(
+            status_code=500,
+            detail="An unexpected error occurred. Please try again.",
+        )
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Encode an event as a server-sent event"""
+    return f"data: {json.dumps(event)}\n\n"
+
+
 # API Endpoints
 
 
@@ -71,7 +110,9 @@ async def query_documents(request: QueryRequest):
             session_id = rag_system.session_manager.create_session()
 
         # Process query using RAG system
-        answer, sources, source_summary = rag_system.query(request.query, session_id)
+        answer, sources, source_summary = await rag_system.aquery(
+            request.query, session_id
+        )
 
         return QueryResponse(
             answer=answer,
@@ -80,35 +121,38 @@ async def query_documents(request: QueryRequest):
             source_summary=source_summary,
         )
     except Exception as e:
-        error_message = str(e)
+        raise _http_error(e)
 
-        # Provide user-friendly error messages
-        if "overloaded" in error_message.lower():
-            raise HTTPException(
-                status_code=503,
-                detail="The AI service is currently experiencing high demand. Please try again in a few minutes.",
-            )
-        elif "rate limit" in error_message.lower():
-            raise HTTPException(
-                status_code=429,
-                detail="Too many requests. Please wait a moment before trying again.",
-            )
-        elif "connection" in error_message.lower():
-            raise HTTPException(
-                status_code=503,
-                detail="Unable to connect to AI service. Please check your internet connection and try again.",
-            )
-        elif "api" in error_message.lower():
-            raise HTTPException(
-                status_code=502,
-                detail="AI service is temporarily unavailable. Please try again later.",
-            )
-        else:
-            # Generic error for unknown issues
-            raise HTTPException(
-                status_code=500,
-                detail="An unexpected error occurred. Please try again.",
-            )
+
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """
+    Process a query, streaming the answer as server-sent events: "text"
+    events carry chunks of the answer, then a "sources" event closes the
+    stream. A failure after the stream has started arrives as an "error"
+    event, since the status code has already been sent.
+    """
+    try:
+        session_id = request.session_id
+        if not session_id:
+            session_id = rag_system.session_manager.create_session()
+    except Exception as e:
+        raise _http_error(e)
+
+    async def events():
+        try:
+            async for event in rag_system.astream_query(request.query, session_id):
+                if event["type"] == "sources":
+                    event = {
+                        **event,
+                        "sources": [s.model_dump() for s in event["sources"]],
+                        "session_id": session_id,
+                    }
+                yield _sse(event)
+        except Exception as e:
+            yield _sse({"type": "error", "detail": _http_error(e).detail})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 @app.get("/api/courses", response_model=CourseStats)
@@ -121,35 +165,7 @@ async def get_course_stats():
             course_titles=analytics["course_titles"],
         )
     except Exception as e:
-        error_message = str(e)
-
-        # Provide user-friendly error messages
-        if "overloaded" in error_message.lower():
-            raise HTTPException(
-                status_code=503,
-                detail="The AI service is currently experiencing high demand. Please try again in a few minutes.",
-            )
-        elif "rate limit" in error_message.lower():
-            raise HTTPException(
-                status_code=429,
-                detail="Too many requests. Please wait a moment before trying again.",
-            )
-        elif "connection" in error_message.lower():
-            raise HTTPException(
-                status_code=503,
-                detail="Unable to connect to AI service. Please check your internet connection and try again.",
-            )
-        elif "api" in error_message.lower():
-            raise HTTPException(
-                status_code=502,
-                detail="AI service is temporarily unavailable. Please try again later.",
-            )
-        else:
-            # Generic error for unknown issues
-            raise HTTPException(
-                status_code=500,
-                detail="An unexpected error occurred. Please try again.",
-            )
+        raise _http_error(e)
 
 
 @app.on_event("startup")
@@ -167,6 +183,12 @@ async def startup_event():
             print(f"Error loading documents: {e}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections to the Anthropic API"""
+    await close_http_client()
+
+
 # Custom static file handler with no-cache headers for development
 
 
@@ -2,6 +2,10 @@ from typing import List, Optional
 
 from pydantic import BaseModel
 
+# Prefix of the message returned when a search matches nothing; lives here
+# so ai_generator can use it without importing search_tools and chromadb
+NO_RESULTS_MESSAGE = "No relevant content found"
+
 
 class Lesson(BaseModel):
     """Represents a lesson within a course"""
@@ -1,7 +1,7 @@
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from ai_generator import AIGenerator
+from ai_generator import AIGenerator, run_sync
 from document_processor import DocumentProcessor
 from models import Course, SourceObject
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
@@ -82,45 +82,56 @@ class RAGSystem:
             print("Clearing existing data for fresh rebuild...")
             self.vector_store.clear_all_data()
 
-        if not os.path.exists(folder_path):
+        try:
+            entries = os.scandir(folder_path)
+        except FileNotFoundError:
             print(f"Folder {folder_path} does not exist")
             return 0, 0
 
-        # Get existing course titles to avoid re-processing
-        existing_course_titles = set(self.vector_store.get_existing_course_titles())
-
-        # Process each file in the folder
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path) and file_name.lower().endswith(
-                (".pdf", ".docx", ".txt")
-            ):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = (
-                        self.document_processor.process_course_document(file_path)
-                    )
-
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(
-                            f"Added new course: {course.title} ({len(course_chunks)} chunks)"
+        with entries:
+            # Get existing course titles to avoid re-processing
+            existing_course_titles = set(self.vector_store.get_existing_course_titles())
+
+            # Process each file in the folder
+            for entry in entries:
+                file_name, file_path = entry.name, entry.path
+                # DirEntry carries the file type from the directory read, so
+                # this usually costs no extra stat per file
+                if entry.is_file() and file_name.lower().endswith(
+                    (".pdf", ".docx", ".txt")
+                ):
+                    try:
+                        # Check if this course might already exist
+                        # We'll process the document to get the course ID, but only add if new
+                        course, course_chunks = (
+                            self.document_processor.process_course_document(file_path)
                         )
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
+
+                        if course and course.title not in existing_course_titles:
+                            # This is a new course - add it to the vector store
+                            self.vector_store.add_course_metadata(course)
+                            self.vector_store.add_course_content(course_chunks)
+                            total_courses += 1
+                            total_chunks += len(course_chunks)
+                            print(
+                                f"Added new course: {course.title} ({len(course_chunks)} chunks)"
+                            )
+                            existing_course_titles.add(course.title)
+                        elif course:
+                            print(f"Course already exists: {course.title} - skipping")
+                    except Exception as e:
+                        print(f"Error processing {file_name}: {e}")
 
         return total_courses, total_chunks
 
     def query(
         self, query: str, session_id: Optional[str] = None
+    ) -> Tuple[str, List[SourceObject], Optional[str]]:
+        """Synchronous wrapper around aquery for callers without an event loop"""
+        return run_sync(self.aquery(query, session_id))
+
+    async def aquery(
+        self, query: str, session_id: Optional[str] = None
     ) -> Tuple[str, List[SourceObject], Optional[str]]:
         """
         Process a user query using the RAG system with tool-based search.
@@ -132,37 +143,82 @@ class RAGSystem:
         Returns:
             Tuple of (response, SourceObject list, source_summary)
         """
+        generator_args, sources = self._prepare_query(query, session_id)
+
+        # Generate response using AI with tools
+        response = await self.ai_generator.agenerate_response(**generator_args)
+
+        source_summary = self._finish_query(query, session_id, response, sources)
+
+        # Return response with SourceObject instances and summary
+        return response, sources, source_summary
+
+    async def astream_query(
+        self, query: str, session_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query like aquery, streaming the answer as it is generated.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            {"type": "text", "text": ...} events for each chunk of the answer,
+            then one {"type": "sources", "sources": ..., "source_summary": ...}
+        """
+        generator_args, sources = self._prepare_query(query, session_id)
+
+        chunks = []
+        async for text in self.ai_generator.astream_response(**generator_args):
+            chunks.append(text)
+            yield {"type": "text", "text": text}
+
+        source_summary = self._finish_query(query, session_id, "".join(chunks), sources)
+        yield {"type": "sources", "sources": sources, "source_summary": source_summary}
+
+    def _prepare_query(
+        self, query: str, session_id: Optional[str]
+    ) -> Tuple[Dict[str, Any], List[SourceObject]]:
+        """Build the generator arguments for a query, and the list its sources go to"""
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
         # Get conversation history if session exists
         history = None
         if session_id:
-            history = self.session_manager.get_conversation_history(session_id)
-
-        # Generate response using AI with tools
-        response = self.ai_generator.generate_response(
-            query=prompt,
-            conversation_history=history,
-            tools=self.tool_manager.get_tool_definitions(),
-            tool_manager=self.tool_manager,
-        )
-
-        # Get sources from the search tool
-        sources = self.tool_manager.get_last_sources()
-
+            history = self.session_manager.get_messages(session_id)
+
+        # Sources are collected per request, so concurrent queries on the
+        # shared tools never pick up each other's sources
+        sources: List[SourceObject] = []
+
+        generator_args = {
+            "query": prompt,
+            "conversation_history": history,
+            "tools": self.tool_manager.get_tool_definitions(),
+            "tool_manager": self.tool_manager,
+            "sources": sources,
+        }
+        return generator_args, sources
+
+    def _finish_query(
+        self,
+        query: str,
+        session_id: Optional[str],
+        response: str,
+        sources: List[SourceObject],
+    ) -> Optional[str]:
+        """Record the exchange and return the summary of the query's sources"""
         # Create source summary
         source_summary = self._create_source_summary(sources)
 
-        # Reset sources after retrieving them
-        self.tool_manager.reset_sources()
-
-        # Update conversation history
-        if session_id:
+        # Update conversation history; an empty answer would become an empty
+        # turn, which the API rejects on the next query
+        if session_id and response:
             self.session_manager.add_exchange(session_id, query, response)
 
-        # Return response with SourceObject instances and summary
-        return response, sources, source_summary
+        return source_summary
 
     def _create_source_summary(self, sources: List[SourceObject]) -> Optional[str]:
         """Create a summary of sources used in the response"""
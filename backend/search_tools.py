@@ -1,8 +1,43 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
-
-from models import SourceObject
-from vector_store import SearchResults, VectorStore
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
+
+from models import NO_RESULTS_MESSAGE, SourceObject
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+from vector_store import SearchResults, VectorStore, parse_lessons
+
+# JSON Schema primitive types accepted in tool input schemas
+_SCHEMA_TYPES: Dict[str, type] = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+def build_input_model(tool_def: Dict[str, Any]) -> Optional[Type[BaseModel]]:
+    """Compile a tool's input_schema into a pydantic model, or None without one"""
+    schema = tool_def.get("input_schema")
+    if not schema or not schema.get("properties"):
+        return None
+
+    required = set(schema.get("required", []))
+    fields: Dict[str, Any] = {}
+    for prop, prop_schema in schema["properties"].items():
+        field_type = _SCHEMA_TYPES.get(prop_schema.get("type"), Any)
+        if prop in required:
+            fields[prop] = (field_type, ...)
+        else:
+            fields[prop] = (Optional[field_type], None)
+
+    return create_model(
+        f"{tool_def['name']}_input",
+        __config__=ConfigDict(extra="forbid"),
+        **fields,
+    )
 
 
 class Tool(ABC):
@@ -18,38 +53,54 @@ class Tool(ABC):
         """Execute the tool with given parameters"""
         pass
 
+    def execute_with_sources(self, **kwargs) -> Tuple[str, List[SourceObject]]:
+        """Execute the tool and return its result with the sources behind it"""
+        return self.execute(**kwargs), []
+
 
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
 
+    # Number of distinct searches whose formatted results are kept
+    CACHE_SIZE = 256
+
+    # Static, so built once; ToolManager sends it to the API on every turn
+    TOOL_DEFINITION: Dict[str, Any] = {
+        "name": "search_course_content",
+        "description": "Search course materials with smart course name matching and lesson filtering",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to search for in the course content",
+                },
+                "course_name": {
+                    "type": "string",
+                    "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
+                },
+                "lesson_number": {
+                    "type": "integer",
+                    "description": "Specific lesson number to search within (e.g. 1, 2, 3)",
+                },
+            },
+            "required": ["query"],
+        },
+    }
+
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
         self.last_sources = []  # Track SourceObject instances from last search
+        # LRU of (formatted result, sources) keyed by normalized search inputs.
+        # Tool calls run in worker threads, so it is only touched under the lock
+        self._cache: OrderedDict[Tuple, Tuple[str, Tuple[SourceObject, ...]]] = (
+            OrderedDict()
+        )
+        self._cache_lock = threading.Lock()
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
-        return {
-            "name": "search_course_content",
-            "description": "Search course materials with smart course name matching and lesson filtering",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "What to search for in the course content",
-                    },
-                    "course_name": {
-                        "type": "string",
-                        "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
-                    },
-                    "lesson_number": {
-                        "type": "integer",
-                        "description": "Specific lesson number to search within (e.g. 1, 2, 3)",
-                    },
-                },
-                "required": ["query"],
-            },
-        }
+        return self.TOOL_DEFINITION
 
     def execute(
         self,
@@ -68,15 +119,64 @@ class CourseSearchTool(Tool):
         Returns:
             Formatted search results or error message
         """
+        formatted, self.last_sources = self.execute_with_sources(
+            query, course_name, lesson_number
+        )
+        return formatted
+
+    def execute_with_sources(
+        self,
+        query: str,
+        course_name: Optional[str] = None,
+        lesson_number: Optional[int] = None,
+    ) -> Tuple[str, List[SourceObject]]:
+        """
+        Search like execute, returning the sources instead of storing them,
+        so concurrent searches never see each other's sources.
+        """
+        # Repeated tool calls are common across turns; the store version
+        # invalidates entries whenever course data changes
+        cache_key = (
+            query.strip().lower(),
+            course_name.strip().lower() if course_name else None,
+            lesson_number,
+            self.store.version,
+        )
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+        if cached is not None:
+            formatted, cached_sources = cached
+            return formatted, list(cached_sources)
 
         # Use the vector store's unified search interface
         results = self.store.search(
             query=query, course_name=course_name, lesson_number=lesson_number
         )
 
-        # Handle errors
+        # Handle errors (not cached, they may be transient)
         if results.error:
-            return results.error
+            return results.error, []
+
+        formatted, sources = self._format_search_results(
+            results, course_name, lesson_number
+        )
+
+        with self._cache_lock:
+            self._cache[cache_key] = (formatted, tuple(sources))
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        return formatted, sources
+
+    def _format_search_results(
+        self,
+        results: SearchResults,
+        course_name: Optional[str],
+        lesson_number: Optional[int],
+    ) -> Tuple[str, List[SourceObject]]:
+        """Format results, or a filter-aware message when nothing matched"""
 
         # Handle empty results
         if results.is_empty():
@@ -85,40 +185,69 @@ class CourseSearchTool(Tool):
                 filter_info += f" in course '{course_name}'"
             if lesson_number:
                 filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
+            return f"{NO_RESULTS_MESSAGE}{filter_info}.", []
 
         # Format and return results
         return self._format_results(results)
 
-    def _format_results(self, results: SearchResults) -> str:
-        """Format search results with course and lesson context"""
-        formatted = []
-        sources = []  # Track SourceObject instances for the UI
+    def _format_results(self, results: SearchResults) -> Tuple[str, List[SourceObject]]:
+        """Format search results with course and lesson context, and their sources"""
+        formatted: List[str] = [""] * len(results.documents)
+        sources: List[SourceObject] = []  # Track SourceObject instances for the UI
         relevance_scores = results.get_relevance_scores()
+        # Top-k hits usually share a course, so each catalog lookup is
+        # resolved once per call rather than once per hit
+        course_links: Dict[str, Optional[str]] = {}
+        lesson_info: Dict[Tuple[str, int], Tuple[Optional[str], Optional[str]]] = {}
+
+        # Order hits by relevance, breaking ties on course, lesson and text so
+        # near-identical queries produce byte-identical tool results
+        hits = sorted(
+            (
+                (
+                    relevance_scores[i] if i < len(relevance_scores) else 0.5,
+                    meta.get("course_title", "unknown"),
+                    meta.get("lesson_number"),
+                    doc,
+                )
+                for i, (doc, meta) in enumerate(
+                    zip(results.documents, results.metadata)
+                )
+            ),
+            key=lambda hit: (
+                -round(hit[0], 6),
+                hit[1],
+                hit[2] is None,
+                hit[2] or 0,
+                hit[3],
+            ),
+        )
 
-        for i, (doc, meta) in enumerate(zip(results.documents, results.metadata)):
-            course_title = meta.get("course_title", "unknown")
-            lesson_num = meta.get("lesson_number")
-
+        for i, (relevance_score, course_title, lesson_num, doc) in enumerate(hits):
             # Build context header
-            header = f"[{course_title}"
-            if lesson_num is not None:
-                header += f" - Lesson {lesson_num}"
-            header += "]"
+            lesson_label = f" - Lesson {lesson_num}" if lesson_num is not None else ""
+            header = f"[{course_title}{lesson_label}]"
 
-            # Create snippet (first 150 characters of content)
-            content_snippet = doc[:150] + "..." if len(doc) > 150 else doc
+            # Create snippet (first 150 characters of whitespace-normalized content)
+            snippet_text = " ".join(doc.split())
+            content_snippet = (
+                snippet_text[:150] + "..." if len(snippet_text) > 150 else snippet_text
+            )
 
             # Get additional metadata
-            course_link = self.store.get_course_link(course_title)
+            if course_title not in course_links:
+                course_links[course_title] = self.store.get_course_link(course_title)
+            course_link = course_links[course_title]
             lesson_link = None
             lesson_title = None
             if lesson_num is not None:
-                lesson_link = self.store.get_lesson_link(course_title, lesson_num)
-                lesson_title = self.store.get_lesson_title(course_title, lesson_num)
-
-            # Get relevance score
-            relevance_score = relevance_scores[i] if i < len(relevance_scores) else 0.5
+                lesson_key = (course_title, lesson_num)
+                if lesson_key not in lesson_info:
+                    lesson_info[lesson_key] = (
+                        self.store.get_lesson_link(course_title, lesson_num),
+                        self.store.get_lesson_title(course_title, lesson_num),
+                    )
+                lesson_link, lesson_title = lesson_info[lesson_key]
 
             # Create SourceObject
             source_obj = SourceObject(
@@ -133,36 +262,36 @@ class CourseSearchTool(Tool):
             )
             sources.append(source_obj)
 
-            formatted.append(f"{header}\n{doc}")
+            formatted[i] = f"{header}\n{doc}"
 
-        # Store SourceObject instances for retrieval
-        self.last_sources = sources
-
-        return "\n\n".join(formatted)
+        return "\n\n".join(formatted), sources
 
 
 class CourseOutlineTool(Tool):
     """Tool for getting course outlines with lesson structure"""
 
+    # Built once at class creation, as for CourseSearchTool
+    TOOL_DEFINITION: Dict[str, Any] = {
+        "name": "get_course_outline",
+        "description": "Get the complete outline of a course including title, link, and all lessons",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "course_name": {
+                    "type": "string",
+                    "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
+                }
+            },
+            "required": ["course_name"],
+        },
+    }
+
     def __init__(self, vector_store: VectorStore):
         self.store = vector_store
 
     def get_tool_definition(self) -> Dict[str, Any]:
         """Return Anthropic tool definition for this tool"""
-        return {
-            "name": "get_course_outline",
-            "description": "Get the complete outline of a course including title, link, and all lessons",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "course_name": {
-                        "type": "string",
-                        "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')",
-                    }
-                },
-                "required": ["course_name"],
-            },
-        }
+        return self.TOOL_DEFINITION
 
     def execute(self, course_name: str) -> str:
         """
@@ -179,22 +308,27 @@ class CourseOutlineTool(Tool):
         if not exact_title:
             return f"No course found matching '{course_name}'"
 
-        # Get the course metadata using the exact title
         try:
-            results = self.store.course_catalog.get(ids=[exact_title])
-            if not results or not results.get("metadatas"):
-                return f"No metadata found for course '{exact_title}'"
-
-            metadata = results["metadatas"][0]
-            course_title = metadata.get("title", exact_title)
-            course_link = metadata.get("course_link", "No link available")
-            instructor = metadata.get("instructor", "Unknown")
-
-            # Parse lessons from JSON
-            import json
-
-            lessons_json = metadata.get("lessons_json", "[]")
-            lessons = json.loads(lessons_json)
+            outline_data = self.store.course_outline_cache.get(exact_title)
+            if outline_data is None:
+                # Not ingested in this process; fall back to the catalog
+                results = self.store.course_catalog.get(ids=[exact_title])
+                if not results or not results.get("metadatas"):
+                    return f"No metadata found for course '{exact_title}'"
+
+                metadata = results["metadatas"][0]
+                outline_data = {
+                    "title": metadata.get("title"),
+                    "instructor": metadata.get("instructor"),
+                    "course_link": metadata.get("course_link"),
+                    "lessons": parse_lessons(metadata.get("lessons_json", "[]")),
+                }
+                self.store.course_outline_cache[exact_title] = outline_data
+
+            course_title = outline_data["title"] or exact_title
+            course_link = outline_data["course_link"] or "No link available"
+            instructor = outline_data["instructor"] or "Unknown"
+            lessons = outline_data["lessons"]
 
             # Format the course outline
             outline = [f"**{course_title}**"]
@@ -211,10 +345,8 @@ class CourseOutlineTool(Tool):
                     lesson_title = lesson.get("lesson_title", "Untitled")
                     lesson_link = lesson.get("lesson_link")
 
-                    lesson_line = f"Lesson {lesson_num}: {lesson_title}"
-                    if lesson_link:
-                        lesson_line += f" ({lesson_link})"
-                    outline.append(lesson_line)
+                    link_suffix = f" ({lesson_link})" if lesson_link else ""
+                    outline.append(f"Lesson {lesson_num}: {lesson_title}{link_suffix}")
 
             return "\n".join(outline)
 
@@ -227,6 +359,14 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        # Definitions are static once registered; keeping them (in
+        # registration order) also keeps the request's tools field byte-stable
+        self._definitions: Dict[str, Dict[str, Any]] = {}
+        self._definitions_list: List[Dict[str, Any]] = []
+        # Tools that track last_sources, resolved once at registration
+        self._source_tools: List[Tool] = []
+        # Input validators compiled from each tool's input_schema
+        self._input_models: Dict[str, Optional[Type[BaseModel]]] = {}
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -234,29 +374,60 @@ class ToolManager:
         tool_name = tool_def.get("name")
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
+        replaced = self.tools.get(tool_name)
+        if replaced is not None and replaced in self._source_tools:
+            self._source_tools.remove(replaced)
         self.tools[tool_name] = tool
+        if hasattr(tool, "last_sources"):
+            self._source_tools.append(tool)
+        self._definitions[tool_name] = tool_def
+        self._input_models[tool_name] = build_input_model(tool_def)
+        self._definitions_list = list(self._definitions.values())
 
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        return self._definitions_list
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
+        checked = self._validate_call(tool_name, kwargs)
+        if isinstance(checked, str):
+            return checked
+        return self.tools[tool_name].execute(**checked)
+
+    def execute_tool_with_sources(
+        self, tool_name: str, **kwargs
+    ) -> Tuple[str, List[SourceObject]]:
+        """Execute a tool by name, returning its result and sources together"""
+        checked = self._validate_call(tool_name, kwargs)
+        if isinstance(checked, str):
+            return checked, []
+        return self.tools[tool_name].execute_with_sources(**checked)
+
+    def _validate_call(
+        self, tool_name: str, kwargs: Dict[str, Any]
+    ) -> Union[str, Dict[str, Any]]:
+        """Return the tool's validated input, or an error message for Claude"""
         if tool_name not in self.tools:
             return f"Tool '{tool_name}' not found"
 
-        return self.tools[tool_name].execute(**kwargs)
+        # Validate (and coerce) Claude's input before it reaches the tool
+        input_model = self._input_models.get(tool_name)
+        if input_model is None:
+            return kwargs
+        try:
+            return input_model.model_validate(kwargs).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            return f"Invalid input for tool '{tool_name}': {e}"
 
     def get_last_sources(self) -> List[SourceObject]:
         """Get SourceObject instances from the last search operation"""
-        # Check all tools for last_sources attribute
-        for tool in self.tools.values():
-            if hasattr(tool, "last_sources") and tool.last_sources:
+        for tool in self._source_tools:
+            if tool.last_sources:
                 return tool.last_sources
         return []
 
     def reset_sources(self):
         """Reset sources from all tools that track sources"""
-        for tool in self.tools.values():
-            if hasattr(tool, "last_sources"):
-                tool.last_sources = []
+        for tool in self._source_tools:
+            tool.last_sources = []
@@ -46,6 +46,12 @@ class SessionManager:
         self.add_message(session_id, "user", user_message)
         self.add_message(session_id, "assistant", assistant_message)
 
+    def get_messages(self, session_id: Optional[str]) -> List[Message]:
+        """Get a copy of the message history for a session, oldest first"""
+        if not session_id:
+            return []
+        return list(self.sessions.get(session_id, ()))
+
     def get_conversation_history(self, session_id: Optional[str]) -> Optional[str]:
         """Get formatted conversation history for a session"""
         if not session_id or session_id not in self.sessions:
@@ -1,200 +1,277 @@
-import pytest
-from unittest.mock import Mock, patch, MagicMock
-import tempfile
-import shutil
+import json
 import os
-import sys
+import threading
+from contextlib import ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
-# Add backend directory to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pytest
 
-from models import Course, Lesson, CourseChunk, SourceObject
-from vector_store import SearchResults
+# backend/ is on sys.path via pytest's pythonpath setting in pyproject.toml
+from models import Course, CourseChunk, Lesson, SourceObject
 
+# rag_system, search_tools and vector_store import chromadb, which takes
+# over half a second, so they are imported inside the fixtures that need
+# them; a run of only the API endpoint tests never loads it.
 
-@pytest.fixture
-def mock_config():
-    """Mock configuration object with default values"""
-    config = Mock()
-    config.CHUNK_SIZE = 500
-    config.CHUNK_OVERLAP = 50
-    config.CHROMA_PATH = ":memory:"
-    config.EMBEDDING_MODEL = "test-model"
-    config.MAX_RESULTS = 5
-    config.ANTHROPIC_API_KEY = "test-key"
-    config.ANTHROPIC_MODEL = "claude-sonnet-4-20250514"
-    config.MAX_HISTORY = 5
-    return config
 
+@pytest.fixture(scope="session")
+def _empty_search_results():
+    """Shared "no hits" search result. Code under test only reads search
+    results, so one instance serves every fixture."""
+    from vector_store import SearchResults
 
-@pytest.fixture
-def temp_directory():
-    """Create a temporary directory for testing file operations"""
-    temp_dir = tempfile.mkdtemp()
-    yield temp_dir
-    shutil.rmtree(temp_dir, ignore_errors=True)
+    return SearchResults(documents=[], metadata=[], distances=[])
 
 
-@pytest.fixture
-def sample_course():
-    """Sample course object for testing"""
-    return Course(
-        title="Python Programming",
-        instructor="Dr. Jane Smith",
-        course_link="https://example.com/python-course",
-        lessons=[
-            Lesson(
-                lesson_number=1,
-                title="Introduction to Python",
-                lesson_link="https://example.com/python-course/lesson-1"
-            ),
-            Lesson(
-                lesson_number=2,
-                title="Variables and Data Types",
-                lesson_link="https://example.com/python-course/lesson-2"
-            )
-        ]
-    )
+# Read-only configuration; plain attributes, no call tracking needed
+_CONFIG = SimpleNamespace(
+    CHUNK_SIZE=500,
+    CHUNK_OVERLAP=50,
+    CHROMA_PATH=":memory:",
+    EMBEDDING_MODEL="test-model",
+    MAX_RESULTS=5,
+    ANTHROPIC_API_KEY="test-key",
+    ANTHROPIC_MODEL="claude-sonnet-4-20250514",
+    MAX_HISTORY=5,
+)
 
 
-@pytest.fixture
-def sample_course_chunks():
-    """Sample course chunks for testing"""
-    return [
-        CourseChunk(
-            content="Python is a high-level programming language known for its simplicity.",
-            course_title="Python Programming",
-            lesson_number=1,
-            chunk_index=0
-        ),
-        CourseChunk(
-            content="Variables in Python are used to store data values.",
-            course_title="Python Programming",
-            lesson_number=2,
-            chunk_index=0
-        )
-    ]
-
+@pytest.fixture(scope="session")
+def mock_config():
+    """Configuration object with default values.
 
-@pytest.fixture
-def sample_search_results():
-    """Sample search results for testing"""
-    return SearchResults(
-        documents=[
-            "Python is a programming language used for web development",
-            "Variables store data values in Python programs"
-        ],
-        metadata=[
-            {"course_title": "Python Programming", "lesson_number": 1},
-            {"course_title": "Python Programming", "lesson_number": 2}
-        ],
-        distances=[0.1, 0.2],
-        error=None
-    )
+    Session-scoped: callers only read attributes, never mutate them.
+    """
+    return _CONFIG
 
 
-@pytest.fixture
-def sample_source_objects():
-    """Sample source objects for testing"""
-    return [
-        SourceObject(
-            course_title="Python Programming",
+# Sample models are validated once at import; models are not frozen, so
+# tests must treat them as read-only
+_SAMPLE_COURSE = Course(
+    title="Python Programming",
+    instructor="Dr. Jane Smith",
+    course_link="https://example.com/python-course",
+    lessons=[
+        Lesson(
             lesson_number=1,
-            lesson_title="Introduction to Python",
-            course_link="https://example.com/python-course",
+            title="Introduction to Python",
             lesson_link="https://example.com/python-course/lesson-1",
-            citation_id=1,
-            relevance_score=0.9
         ),
-        SourceObject(
-            course_title="Python Programming",
+        Lesson(
             lesson_number=2,
-            lesson_title="Variables and Data Types",
-            course_link="https://example.com/python-course",
+            title="Variables and Data Types",
             lesson_link="https://example.com/python-course/lesson-2",
-            citation_id=2,
-            relevance_score=0.8
-        )
-    ]
+        ),
+    ],
+)
+
+_SAMPLE_CHUNKS = [
+    CourseChunk(
+        content="Python is a high-level programming language known for its simplicity.",
+        course_title="Python Programming",
+        lesson_number=1,
+        chunk_index=0,
+    ),
+    CourseChunk(
+        content="Variables in Python are used to store data values.",
+        course_title="Python Programming",
+        lesson_number=2,
+        chunk_index=0,
+    ),
+]
+
+
+@pytest.fixture(scope="session")
+def sample_course():
+    """Sample course object for testing (session-scoped, treat as read-only)"""
+    return _SAMPLE_COURSE
 
 
-@pytest.fixture
-def mock_vector_store():
-    """Mock vector store with common methods"""
-    store = Mock()
-    store.search.return_value = SearchResults.empty()
-    store.get_existing_course_titles.return_value = []
-    store.add_course_metadata.return_value = None
-    store.add_course_content.return_value = None
-    store.get_course_link.return_value = None
-    store.get_lesson_link.return_value = None
-    store.get_lesson_title.return_value = None
-    store._resolve_course_name.return_value = None
-    store.course_catalog.get.return_value = {"metadatas": []}
+@pytest.fixture(scope="session")
+def sample_course_chunks():
+    """Sample course chunks for testing (session-scoped, treat as read-only)"""
+    return _SAMPLE_CHUNKS
+
+
+# Tuple so accidental mutation of the shared sources raises
+_SAMPLE_SOURCES = (
+    SourceObject(
+        course_title="Python Programming",
+        lesson_number=1,
+        lesson_title="Introduction to Python",
+        content_snippet="Python is a programming language used for web development",
+        course_link="https://example.com/python-course",
+        lesson_link="https://example.com/python-course/lesson-1",
+        citation_id=1,
+        relevance_score=0.9,
+    ),
+    SourceObject(
+        course_title="Python Programming",
+        lesson_number=2,
+        lesson_title="Variables and Data Types",
+        content_snippet="Variables store data values in Python programs",
+        course_link="https://example.com/python-course",
+        lesson_link="https://example.com/python-course/lesson-2",
+        citation_id=2,
+        relevance_score=0.8,
+    ),
+)
+
+
+@pytest.fixture(scope="session")
+def sample_source_objects():
+    """Sample source objects for testing (session-scoped, immutable tuple)"""
+    return _SAMPLE_SOURCES
+
+
+# Mock configurations are built once per session and applied per test.
+# copy.copy() of a configured Mock shares its child mocks, so copies would
+# leak call history between tests; only immutable return values live in
+# these templates. Shared spec'd mocks are reset in fixture teardown.
+
+
+@pytest.fixture(scope="session")
+def _vector_store_template(_empty_search_results):
+    """Immutable return values for mock_vector_store"""
+    return {
+        "add_course_metadata.return_value": None,
+        "add_course_content.return_value": None,
+        "get_course_link.return_value": None,
+        "get_lesson_link.return_value": None,
+        "get_lesson_title.return_value": None,
+        "_resolve_course_name.return_value": None,
+        "search.return_value": _empty_search_results,
+    }
+
+
+@pytest.fixture(scope="session")
+def _vector_store_base():
+    """Spec'd vector store mock shared by the session (use mock_vector_store)"""
+    from vector_store import VectorStore
+
+    store = MagicMock(spec=VectorStore)
+    # Collections are instance attributes, so they are not part of the spec
+    store.course_catalog = MagicMock()
+    store.course_content = MagicMock()
     return store
 
 
+@pytest.fixture
+def mock_vector_store(_vector_store_base, _vector_store_template):
+    """Mock vector store with common methods, reset after each test"""
+    store = _vector_store_base
+    # Mutable values are rebuilt for every test
+    store.configure_mock(
+        **_vector_store_template,
+        **{
+            "get_existing_course_titles.return_value": [],
+            "course_catalog.get.return_value": {"metadatas": []},
+            "course_outline_cache": {},
+            "version": 0,
+        },
+    )
+    yield store
+    store.reset_mock(return_value=True, side_effect=True)
+
+
 @pytest.fixture
 def mock_document_processor():
     """Mock document processor"""
-    processor = Mock()
-    processor.process_course_document.return_value = (None, [])
-    return processor
+    return Mock(**{"process_course_document.return_value": (None, [])})
+
+
+@pytest.fixture(scope="session")
+def _ai_generator_template():
+    """Immutable return values for mock_ai_generator"""
+    return {"generate_response.return_value": "Test response"}
 
 
 @pytest.fixture
-def mock_ai_generator():
+def mock_ai_generator(_ai_generator_template):
     """Mock AI generator"""
-    generator = Mock()
-    generator.generate_response.return_value = "Test response"
-    return generator
+    return Mock(**_ai_generator_template)
+
+
+@pytest.fixture(scope="session")
+def _session_manager_template():
+    """Immutable return values for mock_session_manager"""
+    return {
+        "create_session.return_value": "test-session-123",
+        "get_messages.return_value": (),
+        "add_exchange.return_value": None,
+    }
 
 
 @pytest.fixture
-def mock_session_manager():
+def mock_session_manager(_session_manager_template):
     """Mock session manager"""
-    manager = Mock()
-    manager.create_session.return_value = "test-session-123"
-    manager.get_conversation_history.return_value = ""
-    manager.add_exchange.return_value = None
-    return manager
+    return Mock(**_session_manager_template)
+
+
+@pytest.fixture(scope="session")
+def _tool_manager_template():
+    """Immutable return values for mock_tool_manager"""
+    return {
+        "execute_tool.return_value": "Tool execution result",
+        "reset_sources.return_value": None,
+    }
+
+
+@pytest.fixture(scope="session")
+def _tool_manager_base():
+    """Spec'd tool manager mock shared by the session (use mock_tool_manager)"""
+    from search_tools import ToolManager
+
+    return MagicMock(spec=ToolManager)
 
 
 @pytest.fixture
-def mock_tool_manager():
-    """Mock tool manager"""
-    manager = Mock()
-    manager.get_tool_definitions.return_value = []
-    manager.execute_tool.return_value = "Tool execution result"
-    manager.get_last_sources.return_value = []
-    manager.reset_sources.return_value = None
-    return manager
+def mock_tool_manager(_tool_manager_base, _tool_manager_template):
+    """Mock tool manager, reset after each test"""
+    manager = _tool_manager_base
+    # Mutable return values are rebuilt for every test
+    manager.configure_mock(
+        **_tool_manager_template,
+        **{
+            "get_tool_definitions.return_value": [],
+            "get_last_sources.return_value": [],
+        },
+    )
+    yield manager
+    manager.reset_mock(return_value=True, side_effect=True)
+
+
+# Collaborators replaced while constructing RAGSystem in mock_rag_system
+RAG_SYSTEM_PATCH_TARGETS = (
+    "rag_system.SessionManager",
+    "rag_system.AIGenerator",
+    "rag_system.VectorStore",
+    "rag_system.DocumentProcessor",
+)
 
 
 @pytest.fixture
-def mock_rag_system(mock_config):
+def mock_rag_system(mock_config, _empty_search_results):
     """Mock RAG system with all dependencies mocked"""
-    with patch('rag_system.SessionManager') as mock_session_mgr, \
-         patch('rag_system.AIGenerator') as mock_ai_gen, \
-         patch('rag_system.VectorStore') as mock_vector_store, \
-         patch('rag_system.DocumentProcessor') as mock_doc_proc:
-        
-        from rag_system import RAGSystem
+    from rag_system import RAGSystem
+
+    with ExitStack() as stack:
+        for target in RAG_SYSTEM_PATCH_TARGETS:
+            stack.enter_context(patch(target))
         rag = RAGSystem(mock_config)
-        
-        # Configure mocks
-        rag.session_manager.create_session.return_value = "test-session-123"
-        rag.ai_generator.generate_response.return_value = "Test response"
-        rag.vector_store.search.return_value = SearchResults.empty()
-        rag.tool_manager.get_last_sources.return_value = []
-        
-        return rag
 
+    # Configure mocks
+    rag.session_manager.create_session.return_value = "test-session-123"
+    rag.ai_generator.generate_response.return_value = "Test response"
+    rag.vector_store.search.return_value = _empty_search_results
+    # tool_manager is the real ToolManager; its fresh tools report no sources
 
-@pytest.fixture
-def course_document_content():
-    """Sample course document content for file-based testing"""
-    return """Course Title: Python Programming Basics
+    return rag
+
+
+_COURSE_DOC = """Course Title: Python Programming Basics
 Course Link: https://example.com/python-basics
 Course Instructor: Dr. John Doe
 
@@ -209,64 +286,250 @@ Learn about variables, strings, integers, and other data types in Python.
 Lesson 2: Control Structures
 Learn about if statements, loops, and conditional logic.
 """
+# Encoded once so test course files are written without re-encoding
+_COURSE_DOC_BYTES = _COURSE_DOC.encode("utf-8")
+
+
+@pytest.fixture(scope="session")
+def course_document_content():
+    """Sample course document content for file-based testing (session-scoped)"""
+    return _COURSE_DOC
 
 
 @pytest.fixture
-def create_test_course_file(temp_directory, course_document_content):
-    """Create a test course file in temp directory"""
+def create_test_course_file(tmp_path):
+    """Create a test course file in pytest's per-test tmp_path"""
+
     def _create_file(filename="test_course.txt", content=None):
         if content is None:
-            content = course_document_content
-        file_path = os.path.join(temp_directory, filename)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+            data = _COURSE_DOC_BYTES
+        elif isinstance(content, bytes):
+            data = content
+        else:
+            data = content.encode("utf-8")
+        file_path = str(tmp_path / filename)
+        # Raw descriptor write: no buffered/text wrapper for one small write
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+        finally:
+            os.close(fd)
         return file_path
+
     return _create_file
 
 
+# Plain, read-only stand-in for an end_turn Messages API response
+_AI_RESPONSE = SimpleNamespace(
+    content=[SimpleNamespace(type="text", text="Mock AI response")],
+    stop_reason="end_turn",
+)
+
+
+@pytest.fixture(scope="session")
+def anthropic_sdk():
+    """The anthropic module, imported on first use rather than at collection.
+
+    Patch attributes on it with monkeypatch.setattr(anthropic_sdk, name, ...)
+    so the target is bound once instead of resolved from a dotted string.
+    """
+    import anthropic
+
+    return anthropic
+
+
+@pytest.fixture(scope="session")
+def _anthropic_class(anthropic_sdk):
+    """One AsyncAnthropic class stand-in, built once per session.
+
+    The client it returns is spec'd against the real SDK so misspelled
+    attributes fail loudly; messages.create is an AsyncMock because the
+    generator awaits it.
+    """
+    mock_client = MagicMock(
+        spec=anthropic_sdk.AsyncAnthropic, **{"messages.create": AsyncMock()}
+    )
+    return MagicMock(spec=anthropic_sdk.AsyncAnthropic, return_value=mock_client)
+
+
 @pytest.fixture
-def mock_anthropic_client():
+def anthropic_mock(_anthropic_class, anthropic_sdk, monkeypatch):
+    """Install the shared AsyncAnthropic stand-in for one test.
+
+    Yields the patched class; the client is its return_value. Calls,
+    return values and side effects are cleared on teardown so the next
+    test starts from a blank mock.
+    """
+    monkeypatch.setattr(anthropic_sdk, "AsyncAnthropic", _anthropic_class)
+    yield _anthropic_class
+    _anthropic_class.reset_mock()
+    _anthropic_class.return_value.reset_mock(return_value=True, side_effect=True)
+
+
+@pytest.fixture
+def mock_anthropic_client(anthropic_mock):
     """Mock Anthropic client for AI generator testing"""
-    with patch('ai_generator.anthropic.Anthropic') as mock_anthropic:
-        mock_client = Mock()
-        mock_response = Mock()
-        mock_response.content = [Mock(text="Mock AI response")]
-        mock_response.stop_reason = "end_turn"
-        mock_client.messages.create.return_value = mock_response
-        mock_anthropic.return_value = mock_client
-        yield mock_client
+    mock_client = anthropic_mock.return_value
+    mock_client.messages.create.return_value = _AI_RESPONSE
+    return mock_client
+
+
+# Canned Messages API replies for the stub server, keyed on the text of the
+# last message in the request: the user query, or the first tool result
+_STUB_REPLIES = {
+    "What is Python?": {
+        "content": [{"type": "text", "text": "Python is a programming language."}],
+        "stop_reason": "end_turn",
+    },
+    "What is MCP?": {
+        "content": [
+            {
+                "type": "tool_use",
+                "id": "toolu_stub_1",
+                "name": "search_course_content",
+                "input": {"query": "MCP"},
+            }
+        ],
+        "stop_reason": "tool_use",
+    },
+    "MCP content": {
+        "content": [{"type": "text", "text": "MCP is a protocol."}],
+        "stop_reason": "end_turn",
+    },
+}
+
+
+class _StubAnthropicHandler(BaseHTTPRequestHandler):
+    """Answers POST /v1/messages with a canned reply in the real wire format"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        last = body["messages"][-1]["content"]
+        if isinstance(last, list):
+            last = last[0].get("content") or last[0].get("text")
+        reply = _STUB_REPLIES.get(last)
+        if reply is None:
+            status, payload = (
+                400,
+                {
+                    "type": "error",
+                    "error": {
+                        "type": "invalid_request_error",
+                        "message": f"no stub reply for {last!r}",
+                    },
+                },
+            )
+        else:
+            status, payload = (
+                200,
+                {
+                    "id": "msg_stub",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body["model"],
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": 1, "output_tokens": 1},
+                    **reply,
+                },
+            )
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def stub_anthropic():
+    """Base URL of a localhost server speaking the Messages API.
+
+    Started once per session (per worker under xdist). Point the real SDK
+    at it to exercise request serialization and response parsing without
+    mocking the client.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubAnthropicHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _build_search_results(kind):
+    """Build a SearchResults sample: "populated", "empty" or "error" """
+    from vector_store import SearchResults
+
+    if kind == "populated":
+        return SearchResults(
+            documents=[
+                "Python is a programming language used for web development",
+                "Variables store data values in Python programs",
+            ],
+            metadata=[
+                {"course_title": "Python Programming", "lesson_number": 1},
+                {"course_title": "Python Programming", "lesson_number": 2},
+            ],
+            distances=[0.1, 0.2],
+            error=None,
+        )
+    if kind == "empty":
+        return SearchResults(documents=[], metadata=[], distances=[], error=None)
+    if kind == "error":
+        return SearchResults.empty("Database connection failed")
+    raise ValueError(f"Unknown search results kind: {kind}")
+
+
+@pytest.fixture
+def search_results(request):
+    """SearchResults sample; pick the kind with indirect parametrization:
+
+        @pytest.mark.parametrize("search_results", ["empty", "error"], indirect=True)
+
+    Defaults to "populated" when not parametrized.
+    """
+    return _build_search_results(getattr(request, "param", "populated"))
+
+
+@pytest.fixture(scope="session")
+def sample_search_results():
+    """Sample search results for testing (session-scoped, treat as read-only)"""
+    return _build_search_results("populated")
 
 
 @pytest.fixture
 def empty_search_results():
     """Empty search results for testing no-results scenarios"""
-    return SearchResults(
-        documents=[],
-        metadata=[],
-        distances=[],
-        error=None
-    )
+    return _build_search_results("empty")
 
 
 @pytest.fixture
 def error_search_results():
     """Search results with error for testing error scenarios"""
-    return SearchResults(
-        documents=[],
-        metadata=[],
-        distances=[],
-        error="Database connection failed"
-    )
+    return _build_search_results("error")
+
+
+# Catalog metadata in the shape ChromaDB returns it (lessons as JSON text)
+_CATALOG_DATA = {
+    "metadatas": [
+        {
+            "title": "Python Programming",
+            "instructor": "Dr. Jane Smith",
+            "course_link": "https://example.com/python-course",
+            "lessons_json": '[{"lesson_number": 1, "lesson_title": "Introduction to Python", "lesson_link": "https://example.com/python-course/lesson-1"}, {"lesson_number": 2, "lesson_title": "Variables and Data Types", "lesson_link": "https://example.com/python-course/lesson-2"}]',
+        }
+    ]
+}
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def course_catalog_data():
-    """Sample course catalog data for outline testing"""
-    return {
-        'metadatas': [{
-            'title': 'Python Programming',
-            'instructor': 'Dr. Jane Smith',
-            'course_link': 'https://example.com/python-course',
-            'lessons_json': '[{"lesson_number": 1, "lesson_title": "Introduction to Python", "lesson_link": "https://example.com/python-course/lesson-1"}, {"lesson_number": 2, "lesson_title": "Variables and Data Types", "lesson_link": "https://example.com/python-course/lesson-2"}]'
-        }]
-    }
\ No newline at end of file
+    """Sample course catalog data for outline testing (session-scoped, treat as read-only)"""
+    return _CATALOG_DATA
@@ -0,0 +1,39 @@
+"""Plain stand-ins for Anthropic SDK response objects.
+
+The generator only reads attributes off these, so small frozen dataclasses
+are enough; Mock stays reserved for objects whose calls are asserted on.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+@dataclass(slots=True, frozen=True)
+class ToolBlock:
+    """A tool_use content block"""
+
+    name: str
+    input: Dict[str, Any]
+    id: str
+    type: str = "tool_use"
+
+
+@dataclass(slots=True, frozen=True)
+class TextBlock:
+    """A text content block"""
+
+    text: str
+    type: str = "text"
+
+
+@dataclass(slots=True, frozen=True)
+class Message:
+    """A Messages API response"""
+
+    content: List[Any] = field(default_factory=list)
+    stop_reason: str = "end_turn"
+
+
+def message(*content, stop_reason="end_turn"):
+    """A Messages API response carrying the given content blocks"""
+    return Message(list(content), stop_reason)
@@ -1,101 +1,221 @@
+import copy
+import json
 import os
-import shutil
-import sys
-import tempfile
-import unittest
-from unittest.mock import MagicMock, Mock, patch
+import re
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, AsyncMock, MagicMock, Mock, call, patch
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from models import Course, CourseChunk, Lesson, SourceObject
+import pytest
+from models import Course, CourseChunk, Lesson
 from rag_system import RAGSystem
-
-
-class TestRAGSystem(unittest.TestCase):
+from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
+from vector_store import SearchResults
+
+# RAGSystem only reads these attributes
+_CONFIG = SimpleNamespace(
+    CHUNK_SIZE=500,
+    CHUNK_OVERLAP=50,
+    CHROMA_PATH=":memory:",
+    EMBEDDING_MODEL="test-model",
+    MAX_RESULTS=5,
+    ANTHROPIC_API_KEY="test-key",
+    ANTHROPIC_MODEL="test-model",
+    MAX_HISTORY=5,
+)
+
+# Document processing and os.scandir are mocked, so no test reads or writes
+# here; the directory never has to exist
+_TEST_DIR = "/fake/course_docs"
+
+# Sample catalogue shared by every test. The models are not frozen, so tests
+# treat these as read-only and model_copy() one if they need a variant
+_TEST_COURSE = Course(
+    title="Test Course",
+    instructor="Test Instructor",
+    course_link="http://test.com",
+    lessons=[Lesson(lesson_number=1, title="Lesson 1")],
+)
+_TEST_CHUNKS = (
+    CourseChunk(
+        content="Test content chunk",
+        course_title="Test Course",
+        lesson_number=1,
+        chunk_index=0,
+    ),
+)
+
+_PYTHON_BASICS = Course(
+    title="Python Basics",
+    instructor="John Doe",
+    course_link="http://python.com",
+    lessons=[
+        Lesson(
+            lesson_number=1,
+            title="Introduction",
+            lesson_link="http://python.com/1",
+        )
+    ],
+)
+_PYTHON_BASICS_CHUNKS = (
+    CourseChunk(
+        content="Python is a programming language",
+        course_title="Python Basics",
+        lesson_number=1,
+        chunk_index=0,
+    ),
+)
+
+# (course, chunks) for each document in the sample folder, keyed by file stem
+_FOLDER_FIXTURES = {
+    f"course{n}": (
+        Course(
+            title=f"Course {n}",
+            instructor=f"Instructor {n}",
+            course_link=f"http://{n}.com",
+            lessons=[],
+        ),
+        (
+            CourseChunk(
+                content=f"Content {n}",
+                course_title=f"Course {n}",
+                lesson_number=1,
+                chunk_index=0,
+            ),
+        ),
+    )
+    for n in (1, 2, 3)
+}
+
+# course_catalog.get() payload for Python Basics with two lessons
+_CATALOG_PYTHON_BASICS = {
+    "metadatas": [
+        {
+            "title": "Python Basics",
+            "instructor": "John Doe",
+            "course_link": "http://python.com",
+            "lessons_json": json.dumps(
+                [
+                    {
+                        "lesson_number": 1,
+                        "lesson_title": "Introduction",
+                        "lesson_link": "http://python.com/1",
+                    },
+                    {
+                        "lesson_number": 2,
+                        "lesson_title": "Variables",
+                        "lesson_link": "http://python.com/2",
+                    },
+                ]
+            ),
+        }
+    ]
+}
+
+# Every line of the rendered Python Basics outline, in order
+_OUTLINE_RE = re.compile(
+    r"\*\*Python Basics\*\*.*Instructor: John Doe.*Course Link: http://python\.com"
+    r".*Lesson 1: Introduction.*Lesson 2: Variables",
+    re.DOTALL,
+)
+
+# A search that matched nothing
+_EMPTY_SEARCH_RESULT = SearchResults(
+    documents=[], metadata=[], distances=[], error=None
+)
+
+
+def _process_folder_document(file_path):
+    """Stand-in for process_course_document over the sample folder"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return _FOLDER_FIXTURES[stem]
+
+
+def _fake_scandir(folder_path, *names):
+    """Build an os.scandir result listing names as regular files"""
+    entries = MagicMock()
+    entries.__iter__.return_value = [
+        SimpleNamespace(
+            name=name, path=os.path.join(folder_path, name), is_file=lambda: True
+        )
+        for name in names
+    ]
+    return entries
+
+
+@pytest.fixture(scope="class")
+def patched_rag():
+    """RAGSystem built once per class with its components patched out
+
+    Yields the instance and the patched component classes by name.
+    """
+    with patch.multiple(
+        "rag_system",
+        DocumentProcessor=DEFAULT,
+        VectorStore=DEFAULT,
+        AIGenerator=DEFAULT,
+        SessionManager=DEFAULT,
+    ) as component_mocks:
+        yield RAGSystem(_CONFIG), component_mocks
+
+
+@pytest.fixture
+def rag_system(patched_rag):
+    """Per-test shallow copy of the class's RAGSystem with fresh component mocks"""
+    rag_system = copy.copy(patched_rag[0])
+    rag_system.document_processor = Mock()
+    rag_system.vector_store = Mock()
+    rag_system.ai_generator = Mock()
+    rag_system.session_manager = Mock()
+    # Rebuild the tools so they point at this test's vector store
+    rag_system.tool_manager = ToolManager()
+    rag_system.search_tool = CourseSearchTool(rag_system.vector_store)
+    rag_system.outline_tool = CourseOutlineTool(rag_system.vector_store)
+    rag_system.tool_manager.register_tool(rag_system.search_tool)
+    rag_system.tool_manager.register_tool(rag_system.outline_tool)
+    return rag_system
+
+
+class TestRAGSystem:
     """Test suite for RAGSystem integration"""
 
-    def setUp(self):
-        """Set up test fixtures"""
-        # Create mock config
-        self.mock_config = Mock()
-        self.mock_config.CHUNK_SIZE = 500
-        self.mock_config.CHUNK_OVERLAP = 50
-        self.mock_config.CHROMA_PATH = ":memory:"
-        self.mock_config.EMBEDDING_MODEL = "test-model"
-        self.mock_config.MAX_RESULTS = 5
-        self.mock_config.ANTHROPIC_API_KEY = "test-key"
-        self.mock_config.ANTHROPIC_MODEL = "test-model"
-        self.mock_config.MAX_HISTORY = 5
-
-        # Create temp directory for test documents
-        self.test_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up test fixtures"""
-        shutil.rmtree(self.test_dir, ignore_errors=True)
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_rag_system_initialization(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
+    def test_rag_system_initialization(self, patched_rag):
         """Test RAGSystem initialization"""
-        rag_system = RAGSystem(self.mock_config)
-
-        # Verify all components were initialized
-        mock_doc_proc.assert_called_once_with(500, 50)
-        mock_vector_store.assert_called_once_with(":memory:", "test-model", 5)
-        mock_ai_gen.assert_called_once_with("test-key", "test-model")
-        mock_session_mgr.assert_called_once_with(5)
+        # Inspect the class's instance: the rag_system fixture rewires its tools
+        rag_system, mocks = patched_rag
+
+        # Verify all components were initialized, each exactly once
+        expected = {
+            "DocumentProcessor": call(500, 50),
+            "VectorStore": call(":memory:", "test-model", 5),
+            "AIGenerator": call("test-key", "test-model"),
+            "SessionManager": call(5),
+        }
+        assert {name: mock.call_args_list for name, mock in mocks.items()} == {
+            name: [expected_call] for name, expected_call in expected.items()
+        }
 
         # Verify tools are registered
-        self.assertIsNotNone(rag_system.tool_manager)
-        self.assertIsNotNone(rag_system.search_tool)
-        self.assertIsNotNone(rag_system.outline_tool)
+        assert rag_system.tool_manager is not None
+        assert rag_system.search_tool is not None
+        assert rag_system.outline_tool is not None
 
         # Verify tools have vector store reference
-        self.assertEqual(rag_system.search_tool.store, rag_system.vector_store)
-        self.assertEqual(rag_system.outline_tool.store, rag_system.vector_store)
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_add_course_document_success(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
-        """Test successful course document addition"""
-        rag_system = RAGSystem(self.mock_config)
+        assert rag_system.search_tool.store == rag_system.vector_store
+        assert rag_system.outline_tool.store == rag_system.vector_store
 
+    def test_add_course_document_success(self, rag_system):
+        """Test successful course document addition"""
         # Mock document processor
-        mock_course = Course(
-            title="Test Course",
-            instructor="Test Instructor",
-            course_link="http://test.com",
-            lessons=[Lesson(lesson_number=1, title="Lesson 1")],
-        )
-        mock_chunks = [
-            CourseChunk(
-                content="Test content chunk",
-                course_title="Test Course",
-                lesson_number=1,
-                chunk_index=0,
-            )
-        ]
+        mock_course = _TEST_COURSE
+        mock_chunks = _TEST_CHUNKS
 
         rag_system.document_processor.process_course_document.return_value = (
             mock_course,
             mock_chunks,
         )
 
-        # Execute
-        test_file = os.path.join(self.test_dir, "test_course.txt")
-        with open(test_file, "w") as f:
-            f.write("Test content")
-
+        # Execute; process_course_document is mocked, so the file is never read
+        test_file = os.path.join(_TEST_DIR, "test_course.txt")
         course, chunk_count = rag_system.add_course_document(test_file)
 
         # Verify processing
@@ -108,19 +228,11 @@ class TestRAGSystem(unittest.TestCase):
         rag_system.vector_store.add_course_content.assert_called_once_with(mock_chunks)
 
         # Verify return values
-        self.assertEqual(course, mock_course)
-        self.assertEqual(chunk_count, 1)
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_add_course_document_error(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
-        """Test course document addition with error"""
-        rag_system = RAGSystem(self.mock_config)
+        assert course == mock_course
+        assert chunk_count == 1
 
+    def test_add_course_document_error(self, rag_system):
+        """Test course document addition with error"""
         # Mock processing error
         rag_system.document_processor.process_course_document.side_effect = Exception(
             "Processing failed"
@@ -129,294 +241,123 @@ class TestRAGSystem(unittest.TestCase):
         course, chunk_count = rag_system.add_course_document("nonexistent_file.txt")
 
         # Verify error handling
-        self.assertIsNone(course)
-        self.assertEqual(chunk_count, 0)
-
-    @patch("rag_system.os.path.join")
-    @patch("rag_system.os.path.isfile")
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.os.listdir")
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_add_course_folder_success(
-        self,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_session_mgr,
-        mock_listdir,
-        mock_exists,
-        mock_isfile,
-        mock_join,
+        assert course is None
+        assert chunk_count == 0
+
+    @pytest.mark.parametrize(
+        "file_names, existing_titles, processed, added",
+        [
+            (("course1.txt", "course2.pdf", "course3.docx", "readme.md"), [], 3, 3),
+            (("course1.txt", "course2.txt"), ["Course 1"], 2, 1),
+        ],
+        ids=["new_courses", "skip_existing"],
+    )
+    @patch("rag_system.os.scandir")
+    def test_add_course_folder(
+        self, mock_scandir, rag_system, file_names, existing_titles, processed, added
     ):
-        """Test adding course folder with multiple documents"""
-        rag_system = RAGSystem(self.mock_config)
-
-        # Mock file system
-        mock_exists.return_value = True
-        mock_listdir.return_value = [
-            "course1.txt",
-            "course2.pdf",
-            "course3.docx",
-            "readme.md",
-        ]
-        mock_isfile.return_value = True
-
-        # Mock path joining
-        def mock_join_side_effect(base, filename):
-            return f"{base}/{filename}"
-
-        mock_join.side_effect = mock_join_side_effect
-
-        # Mock existing courses (empty initially)
-        rag_system.vector_store.get_existing_course_titles.return_value = []
-
-        # Mock document processing
-        def mock_process_side_effect(file_path):
-            if "course1" in file_path:
-                course = Course(
-                    title="Course 1",
-                    instructor="Instructor 1",
-                    course_link="http://1.com",
-                    lessons=[],
-                )
-                chunks = [
-                    CourseChunk(
-                        content="Content 1",
-                        course_title="Course 1",
-                        lesson_number=1,
-                        chunk_index=0,
-                    )
-                ]
-                return course, chunks
-            elif "course2" in file_path:
-                course = Course(
-                    title="Course 2",
-                    instructor="Instructor 2",
-                    course_link="http://2.com",
-                    lessons=[],
-                )
-                chunks = [
-                    CourseChunk(
-                        content="Content 2",
-                        course_title="Course 2",
-                        lesson_number=1,
-                        chunk_index=0,
-                    )
-                ]
-                return course, chunks
-            elif "course3" in file_path:
-                course = Course(
-                    title="Course 3",
-                    instructor="Instructor 3",
-                    course_link="http://3.com",
-                    lessons=[],
-                )
-                chunks = [
-                    CourseChunk(
-                        content="Content 3",
-                        course_title="Course 3",
-                        lesson_number=1,
-                        chunk_index=0,
-                    )
-                ]
-                return course, chunks
-
+        """Test adding a course folder: unsupported files and known courses are skipped"""
+        mock_scandir.return_value = _fake_scandir(_TEST_DIR, *file_names)
+        rag_system.vector_store.get_existing_course_titles.return_value = (
+            existing_titles
+        )
         rag_system.document_processor.process_course_document.side_effect = (
-            mock_process_side_effect
+            _process_folder_document
         )
 
-        # Execute
-        total_courses, total_chunks = rag_system.add_course_folder(self.test_dir)
+        total_courses, total_chunks = rag_system.add_course_folder(_TEST_DIR)
 
-        # Verify processing (should skip readme.md)
-        self.assertEqual(
-            rag_system.document_processor.process_course_document.call_count, 3
+        # Every supported document is processed (readme.md is not)
+        assert (
+            rag_system.document_processor.process_course_document.call_count
+            == processed
         )
 
-        # Verify results
-        self.assertEqual(total_courses, 3)
-        self.assertEqual(total_chunks, 3)
-
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_add_course_folder_nonexistent(
-        self,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_session_mgr,
-        mock_exists,
-    ):
-        """Test adding course folder that doesn't exist"""
-        rag_system = RAGSystem(self.mock_config)
-
-        mock_exists.return_value = False
+        # Only new courses are added; each sample course has one chunk
+        assert total_courses == added
+        assert total_chunks == added
+        assert rag_system.vector_store.add_course_metadata.call_count == added
+        assert rag_system.vector_store.add_course_content.call_count == added
 
+    @patch("rag_system.os.scandir", side_effect=FileNotFoundError)
+    def test_add_course_folder_nonexistent(self, mock_scandir, rag_system):
+        """Test adding course folder that doesn't exist"""
         total_courses, total_chunks = rag_system.add_course_folder("/nonexistent/path")
 
-        self.assertEqual(total_courses, 0)
-        self.assertEqual(total_chunks, 0)
-
-    @patch("rag_system.os.path.join")
-    @patch("rag_system.os.path.isfile")
-    @patch("rag_system.os.path.exists")
-    @patch("rag_system.os.listdir")
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_add_course_folder_skip_existing(
-        self,
-        mock_doc_proc,
-        mock_vector_store,
-        mock_ai_gen,
-        mock_session_mgr,
-        mock_listdir,
-        mock_exists,
-        mock_isfile,
-        mock_join,
-    ):
-        """Test that existing courses are skipped"""
-        rag_system = RAGSystem(self.mock_config)
-
-        mock_exists.return_value = True
-        mock_listdir.return_value = ["course1.txt", "course2.txt"]
-
-        # Mock existing course
-        rag_system.vector_store.get_existing_course_titles.return_value = ["Course 1"]
-
-        def mock_process_side_effect(file_path):
-            if "course1" in file_path:
-                course = Course(
-                    title="Course 1",
-                    instructor="Instructor 1",
-                    course_link="http://1.com",
-                    lessons=[],
-                )  # Existing
-                chunks = []
-                return course, chunks
-            elif "course2" in file_path:
-                course = Course(
-                    title="Course 2",
-                    instructor="Instructor 2",
-                    course_link="http://2.com",
-                    lessons=[],
-                )  # New
-                chunks = [
-                    CourseChunk(
-                        content="Content 2",
-                        course_title="Course 2",
-                        lesson_number=1,
-                        chunk_index=0,
-                    )
-                ]
-                return course, chunks
+        assert total_courses == 0
+        assert total_chunks == 0
 
-        rag_system.document_processor.process_course_document.side_effect = (
-            mock_process_side_effect
+    def test_query_awaits_ai_generator(self, rag_system):
+        """Test that query drives the async generator and records the exchange"""
+        rag_system.ai_generator.agenerate_response = AsyncMock(
+            return_value="Async answer"
+        )
+        rag_system.session_manager.get_messages.return_value = []
+
+        response, sources, summary = rag_system.query("What is Python?", "s1")
+
+        assert response == "Async answer"
+        assert sources == []
+        assert summary is None
+        call_kwargs = rag_system.ai_generator.agenerate_response.call_args[1]
+        assert "What is Python?" in call_kwargs["query"]
+        assert call_kwargs["tool_manager"] is rag_system.tool_manager
+        assert call_kwargs["sources"] == []
+        rag_system.session_manager.add_exchange.assert_called_once_with(
+            "s1", "What is Python?", "Async answer"
         )
 
-        total_courses, total_chunks = rag_system.add_course_folder(self.test_dir)
+    def test_query_skips_empty_answer_in_history(self, rag_system):
+        """Test that an empty answer is not recorded as a conversation turn"""
+        rag_system.ai_generator.agenerate_response = AsyncMock(return_value="")
+        rag_system.session_manager.get_messages.return_value = []
 
-        # Should only add the new course
-        self.assertEqual(total_courses, 1)
-        self.assertEqual(total_chunks, 1)
+        response, _, _ = rag_system.query("What is Python?", "s1")
 
-        # Verify only the new course was added to vector store
-        rag_system.vector_store.add_course_metadata.assert_called_once()
-        rag_system.vector_store.add_course_content.assert_called_once()
+        assert response == ""
+        rag_system.session_manager.add_exchange.assert_not_called()
 
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_process_query_with_search_tool(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
-        """Test query processing that uses search tool"""
-        rag_system = RAGSystem(self.mock_config)
+    async def test_astream_query_streams_then_reports_sources(self, rag_system):
+        """Test that astream_query passes chunks through and records the answer"""
 
-        # Mock session management
-        rag_system.session_manager.get_conversation_history.return_value = (
-            "Previous conversation"
-        )
+        async def astream_response(**kwargs):
+            for chunk in ("Python ", "is a language."):
+                yield chunk
 
-        # Mock AI response with tool use
-        rag_system.ai_generator.generate_response.return_value = (
-            "Here are the search results about Python functions..."
-        )
+        rag_system.ai_generator.astream_response = astream_response
+        rag_system.session_manager.get_messages.return_value = []
 
-        # Mock tool definitions
-        mock_search_def = {
-            "name": "search_course_content",
-            "description": "Search content",
-        }
-        mock_outline_def = {"name": "get_course_outline", "description": "Get outline"}
-
-        # Create a mock function for get_tool_definitions
-        def mock_get_tool_definitions():
-            return [mock_search_def, mock_outline_def]
-
-        rag_system.tool_manager.get_tool_definitions = mock_get_tool_definitions
-
-        # Execute query
-        session_id = "test_session"
-        query = "Tell me about Python functions"
-
-        # This is a simplified test - in reality we'd need to test the full query method
-        # which would be in the application layer that uses RAGSystem
-        tools = rag_system.tool_manager.get_tool_definitions()
-        response = rag_system.ai_generator.generate_response(
-            query,
-            conversation_history="Previous conversation",
-            tools=tools,
-            tool_manager=rag_system.tool_manager,
-        )
+        events = [
+            event async for event in rag_system.astream_query("What is Python?", "s1")
+        ]
 
-        # Verify AI generator was called with correct parameters
-        rag_system.ai_generator.generate_response.assert_called_once_with(
-            query,
-            conversation_history="Previous conversation",
-            tools=tools,
-            tool_manager=rag_system.tool_manager,
+        assert events == [
+            {"type": "text", "text": "Python "},
+            {"type": "text", "text": "is a language."},
+            {"type": "sources", "sources": [], "source_summary": None},
+        ]
+        rag_system.session_manager.add_exchange.assert_called_once_with(
+            "s1", "What is Python?", "Python is a language."
         )
 
-        self.assertIn("Python functions", response)
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_tool_integration(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
+    def test_tool_integration(self, rag_system):
         """Test that tools are properly integrated with the system"""
-        rag_system = RAGSystem(self.mock_config)
-
         # Test that both tools are registered
         tool_definitions = rag_system.tool_manager.get_tool_definitions()
         tool_names = [tool["name"] for tool in tool_definitions]
 
-        self.assertIn("search_course_content", tool_names)
-        self.assertIn("get_course_outline", tool_names)
+        assert "search_course_content" in tool_names
+        assert "get_course_outline" in tool_names
 
         # Test that tools can be executed
-        rag_system.vector_store.search.return_value = Mock(
-            error=None, documents=[], metadata=[], distances=[]
-        )
+        rag_system.vector_store.search.return_value = _EMPTY_SEARCH_RESULT
 
         search_result = rag_system.tool_manager.execute_tool(
             "search_course_content", query="test query"
         )
 
         # Should return "no results" message
-        self.assertIn("No relevant content found", search_result)
+        assert "No relevant content found" in search_result
 
         # Test outline tool
         rag_system.vector_store._resolve_course_name.return_value = None
@@ -425,55 +366,17 @@ class TestRAGSystem(unittest.TestCase):
             "get_course_outline", course_name="Nonexistent Course"
         )
 
-        self.assertIn("No course found matching", outline_result)
+        assert "No course found matching" in outline_result
 
 
-class TestRAGSystemIntegrationFlow(unittest.TestCase):
+class TestRAGSystemIntegrationFlow:
     """End-to-end integration tests for RAG system flow"""
 
-    def setUp(self):
-        """Set up integration test fixtures"""
-        self.mock_config = Mock()
-        self.mock_config.CHUNK_SIZE = 500
-        self.mock_config.CHUNK_OVERLAP = 50
-        self.mock_config.CHROMA_PATH = ":memory:"
-        self.mock_config.EMBEDDING_MODEL = "test-model"
-        self.mock_config.MAX_RESULTS = 5
-        self.mock_config.ANTHROPIC_API_KEY = "test-key"
-        self.mock_config.ANTHROPIC_MODEL = "test-model"
-        self.mock_config.MAX_HISTORY = 5
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_content_search_flow(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
+    def test_content_search_flow(self, rag_system):
         """Test complete flow for content search queries"""
-        rag_system = RAGSystem(self.mock_config)
-
         # Setup: Mock a course being added
-        mock_course = Course(
-            title="Python Basics",
-            instructor="John Doe",
-            course_link="http://python.com",
-            lessons=[
-                Lesson(
-                    lesson_number=1,
-                    title="Introduction",
-                    lesson_link="http://python.com/1",
-                )
-            ],
-        )
-        mock_chunks = [
-            CourseChunk(
-                content="Python is a programming language",
-                course_title="Python Basics",
-                lesson_number=1,
-                chunk_index=0,
-            )
-        ]
+        mock_course = _PYTHON_BASICS
+        mock_chunks = _PYTHON_BASICS_CHUNKS
 
         rag_system.document_processor.process_course_document.return_value = (
             mock_course,
@@ -484,12 +387,10 @@ class TestRAGSystemIntegrationFlow(unittest.TestCase):
         course, chunk_count = rag_system.add_course_document("test_course.txt")
 
         # Verify course was added
-        self.assertEqual(course.title, "Python Basics")
-        self.assertEqual(chunk_count, 1)
+        assert course.title == "Python Basics"
+        assert chunk_count == 1
 
         # Setup: Mock search results for a query
-        from vector_store import SearchResults
-
         mock_search_results = SearchResults(
             documents=["Python is a programming language used for web development"],
             metadata=[{"course_title": "Python Basics", "lesson_number": 1}],
@@ -506,75 +407,33 @@ class TestRAGSystemIntegrationFlow(unittest.TestCase):
         search_result = rag_system.search_tool.execute("What is Python?")
 
         # Verify search results format
-        self.assertIn("Python Basics", search_result)
-        self.assertIn("Python is a programming language", search_result)
+        assert "Python Basics" in search_result
+        assert "Python is a programming language" in search_result
 
         # Verify sources were tracked
         sources = rag_system.tool_manager.get_last_sources()
-        self.assertEqual(len(sources), 1)
-        self.assertEqual(sources[0].course_title, "Python Basics")
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_outline_query_flow(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
-        """Test complete flow for course outline queries"""
-        rag_system = RAGSystem(self.mock_config)
+        assert len(sources) == 1
+        assert sources[0].course_title == "Python Basics"
 
+    def test_outline_query_flow(self, rag_system):
+        """Test complete flow for course outline queries"""
         # Setup: Mock course outline data
         rag_system.vector_store._resolve_course_name.return_value = "Python Basics"
 
-        mock_catalog_data = {
-            "metadatas": [
-                {
-                    "title": "Python Basics",
-                    "instructor": "John Doe",
-                    "course_link": "http://python.com",
-                    "lessons_json": '[{"lesson_number": 1, "lesson_title": "Introduction", "lesson_link": "http://python.com/1"}, {"lesson_number": 2, "lesson_title": "Variables", "lesson_link": "http://python.com/2"}]',
-                }
-            ]
-        }
-
-        rag_system.vector_store.course_catalog.get.return_value = mock_catalog_data
+        rag_system.vector_store.course_outline_cache = {}
+        rag_system.vector_store.course_catalog.get.return_value = _CATALOG_PYTHON_BASICS
 
         # Test outline tool execution
         outline_result = rag_system.outline_tool.execute("Python")
 
         # Verify outline format
-        self.assertIn("**Python Basics**", outline_result)
-        self.assertIn("Instructor: John Doe", outline_result)
-        self.assertIn("Course Link: http://python.com", outline_result)
-        self.assertIn("Lesson 1: Introduction", outline_result)
-        self.assertIn("Lesson 2: Variables", outline_result)
-
-    @patch("rag_system.SessionManager")
-    @patch("rag_system.AIGenerator")
-    @patch("rag_system.VectorStore")
-    @patch("rag_system.DocumentProcessor")
-    def test_error_handling_flow(
-        self, mock_doc_proc, mock_vector_store, mock_ai_gen, mock_session_mgr
-    ):
-        """Test error handling throughout the system"""
-        rag_system = RAGSystem(self.mock_config)
+        assert _OUTLINE_RE.search(outline_result), outline_result
 
+    def test_error_handling_flow(self, rag_system):
+        """Test that a vector store error surfaces through the search tool"""
         # Test search with error
-        from vector_store import SearchResults
-
         error_results = SearchResults.empty("Vector store connection failed")
         rag_system.vector_store.search.return_value = error_results
 
         search_result = rag_system.search_tool.execute("any query")
-        self.assertEqual(search_result, "Vector store connection failed")
-
-        # Test outline with missing course
-        rag_system.vector_store._resolve_course_name.return_value = None
-
-        outline_result = rag_system.outline_tool.execute("Missing Course")
-        self.assertIn("No course found matching", outline_result)
-
-
-if __name__ == "__main__":
-    unittest.main()
+        assert search_result == "Vector store connection failed"
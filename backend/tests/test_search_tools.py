@@ -1,40 +1,61 @@
-import os
-import sys
-import unittest
-from unittest.mock import MagicMock, Mock, patch
-
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
 
+import pytest
 from models import SourceObject
 from search_tools import CourseOutlineTool, CourseSearchTool, ToolManager
 from vector_store import SearchResults
 
+# Lines the formatted "Python Programming" outline must contain
+_OUTLINE_NEEDLES = (
+    "**Python Programming**",
+    "Instructor: John Doe",
+    "Course Link: http://example.com/python",
+    "Lesson 1: Introduction",
+    "Lesson 2: Variables",
+    "http://example.com/lesson1",
+)
 
-class TestCourseSearchTool(unittest.TestCase):
-    """Test suite for CourseSearchTool"""
 
-    def setUp(self):
-        """Set up test fixtures"""
-        self.mock_vector_store = Mock()
-        self.search_tool = CourseSearchTool(self.mock_vector_store)
+@pytest.fixture
+def search_tool(mock_vector_store):
+    """Fresh search tool on conftest's mock_vector_store, so sources and the
+    result cache never leak between tests"""
+    return CourseSearchTool(mock_vector_store)
+
+
+@pytest.fixture
+def outline_tool(mock_vector_store):
+    return CourseOutlineTool(mock_vector_store)
+
+
+@pytest.fixture
+def tool_manager():
+    return ToolManager()
+
 
-    def test_get_tool_definition(self):
+class TestCourseSearchTool:
+    """Test suite for CourseSearchTool"""
+
+    def test_get_tool_definition(self, search_tool):
         """Test that tool definition is properly structured"""
-        definition = self.search_tool.get_tool_definition()
+        definition = search_tool.get_tool_definition()
 
-        self.assertEqual(definition["name"], "search_course_content")
-        self.assertIn("description", definition)
-        self.assertIn("input_schema", definition)
+        assert definition["name"] == "search_course_content"
+        assert "description" in definition
+        assert "input_schema" in definition
 
         schema = definition["input_schema"]
-        self.assertEqual(schema["type"], "object")
-        self.assertIn("query", schema["properties"])
-        self.assertIn("course_name", schema["properties"])
-        self.assertIn("lesson_number", schema["properties"])
-        self.assertEqual(schema["required"], ["query"])
+        assert schema["type"] == "object"
+        assert "query" in schema["properties"]
+        assert "course_name" in schema["properties"]
+        assert "lesson_number" in schema["properties"]
+        assert schema["required"] == ["query"]
 
-    def test_execute_successful_search(self):
+        # The definition is a class constant, not rebuilt per call
+        assert search_tool.get_tool_definition() is definition
+
+    def test_execute_successful_search(self, mock_vector_store, search_tool):
         """Test successful search execution with results"""
         # Mock search results
         mock_results = SearchResults(
@@ -48,33 +69,29 @@ class TestCourseSearchTool(unittest.TestCase):
         )
 
         # Mock vector store methods
-        self.mock_vector_store.search.return_value = mock_results
-        self.mock_vector_store.get_course_link.return_value = (
-            "http://example.com/course"
-        )
-        self.mock_vector_store.get_lesson_link.return_value = (
-            "http://example.com/lesson1"
-        )
-        self.mock_vector_store.get_lesson_title.return_value = "Introduction"
+        mock_vector_store.search.return_value = mock_results
+        mock_vector_store.get_course_link.return_value = "http://example.com/course"
+        mock_vector_store.get_lesson_link.return_value = "http://example.com/lesson1"
+        mock_vector_store.get_lesson_title.return_value = "Introduction"
 
         # Execute search
-        result = self.search_tool.execute("Python functions")
+        result = search_tool.execute("Python functions")
 
         # Verify vector store was called correctly
-        self.mock_vector_store.search.assert_called_once_with(
+        mock_vector_store.search.assert_called_once_with(
             query="Python functions", course_name=None, lesson_number=None
         )
 
         # Verify result format
-        self.assertIn("Python Basics", result)
-        self.assertIn("This is course content about Python", result)
-        self.assertIn("More Python content", result)
+        assert "Python Basics" in result
+        assert "This is course content about Python" in result
+        assert "More Python content" in result
 
         # Verify sources were tracked
-        self.assertEqual(len(self.search_tool.last_sources), 2)
-        self.assertIsInstance(self.search_tool.last_sources[0], SourceObject)
+        assert len(search_tool.last_sources) == 2
+        assert isinstance(search_tool.last_sources[0], SourceObject)
 
-    def test_execute_with_course_filter(self):
+    def test_execute_with_course_filter(self, mock_vector_store, search_tool):
         """Test search execution with course name filter"""
         mock_results = SearchResults(
             documents=["Filtered content"],
@@ -83,21 +100,21 @@ class TestCourseSearchTool(unittest.TestCase):
             error=None,
         )
 
-        self.mock_vector_store.search.return_value = mock_results
-        self.mock_vector_store.get_course_link.return_value = None
-        self.mock_vector_store.get_lesson_link.return_value = None
-        self.mock_vector_store.get_lesson_title.return_value = None
+        mock_vector_store.search.return_value = mock_results
+        mock_vector_store.get_course_link.return_value = None
+        mock_vector_store.get_lesson_link.return_value = None
+        mock_vector_store.get_lesson_title.return_value = None
 
-        result = self.search_tool.execute("decorators", course_name="Advanced Python")
+        result = search_tool.execute("decorators", course_name="Advanced Python")
 
         # Verify correct parameters passed
-        self.mock_vector_store.search.assert_called_once_with(
+        mock_vector_store.search.assert_called_once_with(
             query="decorators", course_name="Advanced Python", lesson_number=None
         )
 
-        self.assertIn("Advanced Python", result)
+        assert "Advanced Python" in result
 
-    def test_execute_with_lesson_filter(self):
+    def test_execute_with_lesson_filter(self, mock_vector_store, search_tool):
         """Test search execution with lesson number filter"""
         mock_results = SearchResults(
             documents=["Lesson 3 content"],
@@ -106,60 +123,60 @@ class TestCourseSearchTool(unittest.TestCase):
             error=None,
         )
 
-        self.mock_vector_store.search.return_value = mock_results
-        self.mock_vector_store.get_course_link.return_value = None
-        self.mock_vector_store.get_lesson_link.return_value = None
-        self.mock_vector_store.get_lesson_title.return_value = "Functions"
+        mock_vector_store.search.return_value = mock_results
+        mock_vector_store.get_course_link.return_value = None
+        mock_vector_store.get_lesson_link.return_value = None
+        mock_vector_store.get_lesson_title.return_value = "Functions"
 
-        result = self.search_tool.execute("variables", lesson_number=3)
+        result = search_tool.execute("variables", lesson_number=3)
 
-        self.mock_vector_store.search.assert_called_once_with(
+        mock_vector_store.search.assert_called_once_with(
             query="variables", course_name=None, lesson_number=3
         )
 
-        self.assertIn("Lesson 3", result)
+        assert "Lesson 3" in result
 
-    def test_execute_no_results(self):
+    def test_execute_no_results(self, mock_vector_store, search_tool):
         """Test handling when search returns no results"""
         mock_results = SearchResults(
             documents=[], metadata=[], distances=[], error=None
         )
 
-        self.mock_vector_store.search.return_value = mock_results
+        mock_vector_store.search.return_value = mock_results
 
-        result = self.search_tool.execute("nonexistent topic")
+        result = search_tool.execute("nonexistent topic")
 
-        self.assertEqual(result, "No relevant content found.")
-        self.assertEqual(len(self.search_tool.last_sources), 0)
+        assert result == "No relevant content found."
+        assert len(search_tool.last_sources) == 0
 
-    def test_execute_no_results_with_filters(self):
+    def test_execute_no_results_with_filters(self, mock_vector_store, search_tool):
         """Test no results message includes filter information"""
         mock_results = SearchResults(
             documents=[], metadata=[], distances=[], error=None
         )
 
-        self.mock_vector_store.search.return_value = mock_results
+        mock_vector_store.search.return_value = mock_results
 
-        result = self.search_tool.execute(
+        result = search_tool.execute(
             "topic", course_name="Missing Course", lesson_number=5
         )
 
-        self.assertIn("Missing Course", result)
-        self.assertIn("lesson 5", result)
+        assert "Missing Course" in result
+        assert "lesson 5" in result
 
-    def test_execute_search_error(self):
+    def test_execute_search_error(self, mock_vector_store, search_tool):
         """Test handling of search errors"""
         mock_results = SearchResults(
             documents=[], metadata=[], distances=[], error="Database connection failed"
         )
 
-        self.mock_vector_store.search.return_value = mock_results
+        mock_vector_store.search.return_value = mock_results
 
-        result = self.search_tool.execute("any query")
+        result = search_tool.execute("any query")
 
-        self.assertEqual(result, "Database connection failed")
+        assert result == "Database connection failed"
 
-    def test_source_object_creation(self):
+    def test_source_object_creation(self, mock_vector_store, search_tool):
         """Test that SourceObject instances are created correctly"""
         mock_results = SearchResults(
             documents=["Test content for source tracking"],
@@ -168,48 +185,136 @@ class TestCourseSearchTool(unittest.TestCase):
             error=None,
         )
 
-        self.mock_vector_store.search.return_value = mock_results
-        self.mock_vector_store.get_course_link.return_value = "http://test-course.com"
-        self.mock_vector_store.get_lesson_link.return_value = "http://test-lesson.com"
-        self.mock_vector_store.get_lesson_title.return_value = "Test Lesson"
+        mock_vector_store.search.return_value = mock_results
+        mock_vector_store.get_course_link.return_value = "http://test-course.com"
+        mock_vector_store.get_lesson_link.return_value = "http://test-lesson.com"
+        mock_vector_store.get_lesson_title.return_value = "Test Lesson"
+
+        search_tool.execute("test query")
+
+        source = search_tool.last_sources[0]
+        assert source.course_title == "Test Course"
+        assert source.lesson_number == 1
+        assert source.lesson_title == "Test Lesson"
+        assert source.course_link == "http://test-course.com"
+        assert source.lesson_link == "http://test-lesson.com"
+        assert source.citation_id == 1
+        assert source.relevance_score > 0
+
+    def test_format_results_looks_up_each_course_once(
+        self, mock_vector_store, search_tool
+    ):
+        """Test that hits from the same course share catalog lookups"""
+        mock_results = SearchResults(
+            documents=["First chunk", "Second chunk", "Third chunk"],
+            metadata=[
+                {"course_title": "Test Course", "lesson_number": 1},
+                {"course_title": "Test Course", "lesson_number": 1},
+                {"course_title": "Test Course", "lesson_number": 2},
+            ],
+            distances=[0.1, 0.2, 0.3],
+            error=None,
+        )
+        mock_vector_store.get_course_link.return_value = "http://test-course.com"
+        mock_vector_store.get_lesson_link.return_value = "http://test-lesson.com"
+        mock_vector_store.get_lesson_title.return_value = "Test Lesson"
+
+        _, sources = search_tool._format_results(mock_results)
+
+        mock_vector_store.get_course_link.assert_called_once_with("Test Course")
+        assert mock_vector_store.get_lesson_link.call_count == 2
+        assert mock_vector_store.get_lesson_title.call_count == 2
+        assert len(sources) == 3
+        assert sources[2].course_link == "http://test-course.com"
+
+    def test_format_results_orders_ties_deterministically(
+        self, mock_vector_store, search_tool
+    ):
+        """Test that equal-relevance hits are ordered by course and lesson"""
+        mock_results = SearchResults(
+            documents=["Beta   chunk\n text", "Alpha chunk"],
+            metadata=[
+                {"course_title": "Beta Course", "lesson_number": 1},
+                {"course_title": "Alpha Course", "lesson_number": 2},
+            ],
+            distances=[0.2, 0.2],
+            error=None,
+        )
+        mock_vector_store.get_course_link.return_value = None
+        mock_vector_store.get_lesson_link.return_value = None
+        mock_vector_store.get_lesson_title.return_value = None
+
+        result, sources = search_tool._format_results(mock_results)
+
+        assert result.startswith("[Alpha Course - Lesson 2]")
+        assert [s.course_title for s in sources] == ["Alpha Course", "Beta Course"]
+        assert sources[0].citation_id == 1
+        assert sources[1].content_snippet == "Beta chunk text"
+
+    def test_repeated_search_served_from_cache(self, mock_vector_store, search_tool):
+        """Test that identical searches reuse the cached result and sources"""
+        mock_results = SearchResults(
+            documents=["Cached content"],
+            metadata=[{"course_title": "Test Course", "lesson_number": 1}],
+            distances=[0.1],
+            error=None,
+        )
+        mock_vector_store.version = 0
+        mock_vector_store.search.return_value = mock_results
+        mock_vector_store.get_course_link.return_value = None
+        mock_vector_store.get_lesson_link.return_value = None
+        mock_vector_store.get_lesson_title.return_value = None
+
+        first = search_tool.execute("MCP servers", course_name="MCP")
+        first_sources = search_tool.last_sources
+        search_tool.last_sources = []
+        second = search_tool.execute(" mcp servers ", course_name="mcp")
+
+        assert first == second
+        assert search_tool.last_sources == first_sources
+        mock_vector_store.search.assert_called_once()
+
+        # A store write invalidates the cached entry
+        mock_vector_store.version = 1
+        search_tool.execute("MCP servers", course_name="MCP")
+        assert mock_vector_store.search.call_count == 2
+
+    def test_search_errors_not_cached(self, mock_vector_store, search_tool):
+        """Test that error results are retried on the next call"""
+        mock_vector_store.version = 0
+        mock_vector_store.search.return_value = SearchResults.empty(
+            "Database connection failed"
+        )
 
-        self.search_tool.execute("test query")
+        search_tool.execute("any query")
+        search_tool.execute("any query")
 
-        source = self.search_tool.last_sources[0]
-        self.assertEqual(source.course_title, "Test Course")
-        self.assertEqual(source.lesson_number, 1)
-        self.assertEqual(source.lesson_title, "Test Lesson")
-        self.assertEqual(source.course_link, "http://test-course.com")
-        self.assertEqual(source.lesson_link, "http://test-lesson.com")
-        self.assertEqual(source.citation_id, 1)
-        self.assertGreater(source.relevance_score, 0)
+        assert mock_vector_store.search.call_count == 2
 
 
-class TestCourseOutlineTool(unittest.TestCase):
+class TestCourseOutlineTool:
     """Test suite for CourseOutlineTool"""
 
-    def setUp(self):
-        """Set up test fixtures"""
-        self.mock_vector_store = Mock()
-        self.outline_tool = CourseOutlineTool(self.mock_vector_store)
-
-    def test_get_tool_definition(self):
+    def test_get_tool_definition(self, outline_tool):
         """Test that outline tool definition is properly structured"""
-        definition = self.outline_tool.get_tool_definition()
+        definition = outline_tool.get_tool_definition()
 
-        self.assertEqual(definition["name"], "get_course_outline")
-        self.assertIn("description", definition)
-        self.assertIn("input_schema", definition)
+        assert definition["name"] == "get_course_outline"
+        assert "description" in definition
+        assert "input_schema" in definition
 
         schema = definition["input_schema"]
-        self.assertEqual(schema["type"], "object")
-        self.assertIn("course_name", schema["properties"])
-        self.assertEqual(schema["required"], ["course_name"])
-
-    def test_execute_successful_outline_retrieval(self):
+        assert schema["type"] == "object"
+        assert "course_name" in schema["properties"]
+        assert schema["required"] == ["course_name"]
+        assert outline_tool.get_tool_definition() is definition
+
+    def test_execute_successful_outline_retrieval(
+        self, mock_vector_store, outline_tool
+    ):
         """Test successful course outline retrieval"""
         # Mock course resolution
-        self.mock_vector_store._resolve_course_name.return_value = "Python Programming"
+        mock_vector_store._resolve_course_name.return_value = "Python Programming"
 
         # Mock course catalog data
         mock_catalog_result = {
@@ -223,46 +328,42 @@ class TestCourseOutlineTool(unittest.TestCase):
             ]
         }
 
-        self.mock_vector_store.course_catalog.get.return_value = mock_catalog_result
+        mock_vector_store.course_catalog.get.return_value = mock_catalog_result
 
-        result = self.outline_tool.execute("Python")
+        result = outline_tool.execute("Python")
 
         # Verify course name resolution
-        self.mock_vector_store._resolve_course_name.assert_called_once_with("Python")
+        mock_vector_store._resolve_course_name.assert_called_once_with("Python")
 
         # Verify catalog query
-        self.mock_vector_store.course_catalog.get.assert_called_once_with(
+        mock_vector_store.course_catalog.get.assert_called_once_with(
             ids=["Python Programming"]
         )
 
         # Verify result format
-        self.assertIn("**Python Programming**", result)
-        self.assertIn("Instructor: John Doe", result)
-        self.assertIn("Course Link: http://example.com/python", result)
-        self.assertIn("Lesson 1: Introduction", result)
-        self.assertIn("Lesson 2: Variables", result)
-        self.assertIn("http://example.com/lesson1", result)
-
-    def test_execute_course_not_found(self):
+        missing = [n for n in _OUTLINE_NEEDLES if n not in result]
+        assert not missing, f"outline is missing: {missing}"
+
+    def test_execute_course_not_found(self, mock_vector_store, outline_tool):
         """Test handling when course name cannot be resolved"""
-        self.mock_vector_store._resolve_course_name.return_value = None
+        mock_vector_store._resolve_course_name.return_value = None
 
-        result = self.outline_tool.execute("Nonexistent Course")
+        result = outline_tool.execute("Nonexistent Course")
 
-        self.assertEqual(result, "No course found matching 'Nonexistent Course'")
+        assert result == "No course found matching 'Nonexistent Course'"
 
-    def test_execute_no_metadata(self):
+    def test_execute_no_metadata(self, mock_vector_store, outline_tool):
         """Test handling when course has no metadata"""
-        self.mock_vector_store._resolve_course_name.return_value = "Test Course"
-        self.mock_vector_store.course_catalog.get.return_value = {"metadatas": []}
+        mock_vector_store._resolve_course_name.return_value = "Test Course"
+        mock_vector_store.course_catalog.get.return_value = {"metadatas": []}
 
-        result = self.outline_tool.execute("Test")
+        result = outline_tool.execute("Test")
 
-        self.assertIn("No metadata found for course 'Test Course'", result)
+        assert "No metadata found for course 'Test Course'" in result
 
-    def test_execute_no_lessons(self):
+    def test_execute_no_lessons(self, mock_vector_store, outline_tool):
         """Test handling course with no lessons"""
-        self.mock_vector_store._resolve_course_name.return_value = "Empty Course"
+        mock_vector_store._resolve_course_name.return_value = "Empty Course"
         mock_catalog_result = {
             "metadatas": [
                 {
@@ -274,86 +375,171 @@ class TestCourseOutlineTool(unittest.TestCase):
             ]
         }
 
-        self.mock_vector_store.course_catalog.get.return_value = mock_catalog_result
+        mock_vector_store.course_catalog.get.return_value = mock_catalog_result
+
+        result = outline_tool.execute("Empty")
+
+        assert "**Empty Course**" in result
+        assert "No lessons found" in result
+
+    def test_execute_uses_outline_cache(self, mock_vector_store, outline_tool):
+        """Test that cached outlines skip the catalog lookup"""
+        mock_vector_store._resolve_course_name.return_value = "Cached Course"
+        mock_vector_store.course_outline_cache["Cached Course"] = {
+            "title": "Cached Course",
+            "instructor": "Jane Smith",
+            "course_link": None,
+            "lessons": ({"lesson_number": 1, "lesson_title": "Intro"},),
+        }
+
+        result = outline_tool.execute("Cached")
 
-        result = self.outline_tool.execute("Empty")
+        mock_vector_store.course_catalog.get.assert_not_called()
+        assert "**Cached Course**" in result
+        assert "Course Link: No link available" in result
+        assert "Lesson 1: Intro" in result
 
-        self.assertIn("**Empty Course**", result)
-        self.assertIn("No lessons found", result)
+    def test_execute_populates_outline_cache(self, mock_vector_store, outline_tool):
+        """Test that a catalog fallback is cached for the next call"""
+        mock_vector_store._resolve_course_name.return_value = "Empty Course"
+        mock_vector_store.course_catalog.get.return_value = {
+            "metadatas": [{"title": "Empty Course", "lessons_json": "[]"}]
+        }
 
+        first = outline_tool.execute("Empty")
+        second = outline_tool.execute("Empty")
+
+        assert first == second
+        mock_vector_store.course_catalog.get.assert_called_once()
+        assert "Empty Course" in mock_vector_store.course_outline_cache
 
-class TestToolManager(unittest.TestCase):
-    """Test suite for ToolManager"""
 
-    def setUp(self):
-        """Set up test fixtures"""
-        self.tool_manager = ToolManager()
-        self.mock_vector_store = Mock()
+class TestToolManager:
+    """Test suite for ToolManager"""
 
-    def test_register_tool(self):
+    def test_register_tool(self, mock_vector_store, tool_manager):
         """Test tool registration"""
-        search_tool = CourseSearchTool(self.mock_vector_store)
-        self.tool_manager.register_tool(search_tool)
+        search_tool = CourseSearchTool(mock_vector_store)
+        tool_manager.register_tool(search_tool)
 
-        self.assertIn("search_course_content", self.tool_manager.tools)
-        self.assertEqual(self.tool_manager.tools["search_course_content"], search_tool)
+        assert "search_course_content" in tool_manager.tools
+        assert tool_manager.tools["search_course_content"] == search_tool
 
-    def test_get_tool_definitions(self):
+    def test_get_tool_definitions(self, mock_vector_store, tool_manager):
         """Test getting all tool definitions"""
-        search_tool = CourseSearchTool(self.mock_vector_store)
-        outline_tool = CourseOutlineTool(self.mock_vector_store)
+        search_tool = CourseSearchTool(mock_vector_store)
+        outline_tool = CourseOutlineTool(mock_vector_store)
 
-        self.tool_manager.register_tool(search_tool)
-        self.tool_manager.register_tool(outline_tool)
+        tool_manager.register_tool(search_tool)
+        tool_manager.register_tool(outline_tool)
 
-        definitions = self.tool_manager.get_tool_definitions()
+        definitions = tool_manager.get_tool_definitions()
 
-        self.assertEqual(len(definitions), 2)
+        assert len(definitions) == 2
         tool_names = [d["name"] for d in definitions]
-        self.assertIn("search_course_content", tool_names)
-        self.assertIn("get_course_outline", tool_names)
+        assert "search_course_content" in tool_names
+        assert "get_course_outline" in tool_names
+
+        # Definitions are built once and reused across calls
+        assert tool_manager.get_tool_definitions() is definitions
 
-    def test_execute_tool(self):
+    def test_execute_tool(self, tool_manager):
         """Test tool execution through manager"""
         mock_tool = Mock()
         mock_tool.get_tool_definition.return_value = {"name": "test_tool"}
         mock_tool.execute.return_value = "Test result"
 
-        self.tool_manager.register_tool(mock_tool)
+        tool_manager.register_tool(mock_tool)
 
-        result = self.tool_manager.execute_tool("test_tool", param1="value1")
+        result = tool_manager.execute_tool("test_tool", param1="value1")
 
         mock_tool.execute.assert_called_once_with(param1="value1")
-        self.assertEqual(result, "Test result")
+        assert result == "Test result"
+
+    def test_execute_tool_validates_input(self, mock_vector_store, tool_manager):
+        """Test that tool input is checked against the tool's input_schema"""
+        search_tool = CourseSearchTool(mock_vector_store)
+        search_tool.execute = Mock(return_value="Search result")
+        tool_manager.register_tool(search_tool)
+
+        result = tool_manager.execute_tool(
+            "search_course_content", query="MCP", lesson_number="2"
+        )
+
+        assert result == "Search result"
+        search_tool.execute.assert_called_once_with(query="MCP", lesson_number=2)
+
+        result = tool_manager.execute_tool("search_course_content", lesson_number=1)
 
-    def test_execute_nonexistent_tool(self):
+        assert "Invalid input for tool 'search_course_content'" in result
+        search_tool.execute.assert_called_once()
+
+    def test_execute_nonexistent_tool(self, tool_manager):
         """Test executing a tool that doesn't exist"""
-        result = self.tool_manager.execute_tool("nonexistent_tool")
+        result = tool_manager.execute_tool("nonexistent_tool")
 
-        self.assertEqual(result, "Tool 'nonexistent_tool' not found")
+        assert result == "Tool 'nonexistent_tool' not found"
 
-    def test_get_last_sources(self):
+    def test_get_last_sources(self, mock_vector_store, tool_manager):
         """Test retrieving last sources from tools"""
-        search_tool = CourseSearchTool(self.mock_vector_store)
+        search_tool = CourseSearchTool(mock_vector_store)
         search_tool.last_sources = [Mock(spec=SourceObject)]
 
-        self.tool_manager.register_tool(search_tool)
+        tool_manager.register_tool(search_tool)
 
-        sources = self.tool_manager.get_last_sources()
+        sources = tool_manager.get_last_sources()
 
-        self.assertEqual(len(sources), 1)
-        self.assertEqual(sources, search_tool.last_sources)
+        assert len(sources) == 1
+        assert sources == search_tool.last_sources
 
-    def test_reset_sources(self):
+    def test_reset_sources(self, mock_vector_store, tool_manager):
         """Test resetting sources from all tools"""
-        search_tool = CourseSearchTool(self.mock_vector_store)
+        search_tool = CourseSearchTool(mock_vector_store)
         search_tool.last_sources = [Mock(spec=SourceObject)]
 
-        self.tool_manager.register_tool(search_tool)
-        self.tool_manager.reset_sources()
-
-        self.assertEqual(len(search_tool.last_sources), 0)
-
-
-if __name__ == "__main__":
-    unittest.main()
+        tool_manager.register_tool(search_tool)
+        tool_manager.reset_sources()
+
+        assert len(search_tool.last_sources) == 0
+
+    def test_reset_sources_skips_tools_without_sources(
+        self, mock_vector_store, tool_manager
+    ):
+        """Test that only source-tracking tools are swept"""
+        search_tool = CourseSearchTool(mock_vector_store)
+        outline_tool = CourseOutlineTool(mock_vector_store)
+
+        tool_manager.register_tool(search_tool)
+        tool_manager.register_tool(outline_tool)
+        tool_manager.reset_sources()
+
+        assert tool_manager._source_tools == [search_tool]
+        assert not hasattr(outline_tool, "last_sources")
+        assert tool_manager.get_last_sources() == []
+
+    def test_execute_tool_with_sources_keeps_calls_apart(
+        self, mock_vector_store, search_tool, tool_manager
+    ):
+        """Test that concurrent calls each get their own sources back"""
+        mock_vector_store.search.side_effect = lambda query, **_: SearchResults(
+            documents=[f"About {query}"],
+            metadata=[{"course_title": query, "lesson_number": 1}],
+            distances=[0.1],
+            error=None,
+        )
+        tool_manager.register_tool(search_tool)
+        queries = [f"Course {i}" for i in range(8)]
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            outputs = list(
+                pool.map(
+                    lambda query: tool_manager.execute_tool_with_sources(
+                        "search_course_content", query=query
+                    ),
+                    queries,
+                )
+            )
+
+        assert [sources[0].course_title for _, sources in outputs] == queries
+        # The shared tool's own sources are left alone
+        assert search_tool.last_sources == []
@@ -1,11 +1,19 @@
+import json
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import chromadb
 from chromadb.config import Settings
 from models import Course, CourseChunk
 
 
+@lru_cache(maxsize=128)
+def parse_lessons(lessons_json: str) -> Tuple[Dict[str, Any], ...]:
+    """Decode a catalog ``lessons_json`` string; results are shared, treat as read-only"""
+    return tuple(json.loads(lessons_json))
+
+
 @dataclass
 class SearchResults:
     """Container for search results with metadata"""
@@ -56,6 +64,10 @@ class VectorStore:
 
     def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
         self.max_results = max_results
+        # Bumped on every write so callers can invalidate cached lookups
+        self.version = 0
+        # Decoded course outlines keyed by exact course title
+        self.course_outline_cache: Dict[str, Dict[str, Any]] = {}
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
             path=chroma_path, settings=Settings(anonymized_telemetry=False)
@@ -159,8 +171,6 @@ class VectorStore:
 
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
-
         course_text = course.title
 
         # Build lessons metadata and serialize as JSON string
@@ -189,6 +199,13 @@ class VectorStore:
             ],
             ids=[course.title],
         )
+        self.course_outline_cache[course.title] = {
+            "title": course.title,
+            "instructor": course.instructor,
+            "course_link": course.course_link,
+            "lessons": tuple(lessons_metadata),
+        }
+        self.version += 1
 
     def add_course_content(self, chunks: List[CourseChunk]):
         """Add course content chunks to the vector store"""
@@ -211,6 +228,7 @@ class VectorStore:
         ]
 
         self.course_content.add(documents=documents, metadatas=metadatas, ids=ids)
+        self.version += 1
 
     def clear_all_data(self):
         """Clear all data from both collections"""
@@ -220,6 +238,8 @@ class VectorStore:
             # Recreate collections
             self.course_catalog = self._create_collection("course_catalog")
             self.course_content = self._create_collection("course_content")
+            self.course_outline_cache.clear()
+            self.version += 1
         except Exception as e:
             print(f"Error clearing data: {e}")
 
@@ -248,8 +268,6 @@ class VectorStore:
 
     def get_all_courses_metadata(self) -> List[Dict[str, Any]]:
         """Get metadata for all courses in the vector store"""
-        import json
-
         try:
             results = self.course_catalog.get()
             if results and "metadatas" in results:
@@ -258,7 +276,9 @@ class VectorStore:
                 for metadata in results["metadatas"]:
                     course_meta = metadata.copy()
                     if "lessons_json" in course_meta:
-                        course_meta["lessons"] = json.loads(course_meta["lessons_json"])
+                        course_meta["lessons"] = list(
+                            parse_lessons(course_meta["lessons_json"])
+                        )
                         del course_meta[
                             "lessons_json"
                         ]  # Remove the JSON string version
@@ -284,8 +304,6 @@ class VectorStore:
 
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
-        import json
-
         try:
             # Get course by ID (title is the ID)
             results = self.course_catalog.get(ids=[course_title])
@@ -293,7 +311,7 @@ class VectorStore:
                 metadata = results["metadatas"][0]
                 lessons_json = metadata.get("lessons_json")
                 if lessons_json:
-                    lessons = json.loads(lessons_json)
+                    lessons = parse_lessons(lessons_json)
                     # Find the lesson with matching number
                     for lesson in lessons:
                         if lesson.get("lesson_number") == lesson_number:
@@ -304,8 +322,6 @@ class VectorStore:
 
     def get_lesson_title(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson title for a given course title and lesson number"""
-        import json
-
         try:
             # Get course by ID (title is the ID)
             results = self.course_catalog.get(ids=[course_title])
@@ -313,7 +329,7 @@ class VectorStore:
                 metadata = results["metadatas"][0]
                 lessons_json = metadata.get("lessons_json")
                 if lessons_json:
-                    lessons = json.loads(lessons_json)
+                    lessons = parse_lessons(lessons_json)
                     # Find the lesson with matching number
                     for lesson in lessons:
                         if lesson.get("lesson_number") == lesson_number:
@@ -9,6 +9,6 @@ echo "🔍 Running code quality checks..."
 echo "📦 Installing development dependencies..."
 uv sync --extra dev
 
-# Run the quality check script
+# Run the quality check script (already synced above)
 echo "🚀 Running quality checks..."
-uv run python scripts/check.py
\ No newline at end of file
+uv run --no-sync python scripts/check.py
\ No newline at end of file
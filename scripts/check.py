@@ -1,72 +1,139 @@
 #!/usr/bin/env python3
 """Script to run all quality checks."""
 
+import argparse
+import io
+import os
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Run via `uv run python scripts/...`, so the tools are already installed in
+# this interpreter's environment; invoking them through it avoids a nested
+# `uv run` (environment check plus another interpreter start) per tool
+PYTHON_M = [sys.executable, "-m"]
 
-def run_command(command: list[str]) -> int:
-    """Run a command and return its exit code."""
-    print(f"Running: {' '.join(command)}")
-    result = subprocess.run(command, cwd=Path(__file__).parent.parent)
-    return result.returncode
+# Paths every tool runs over
+TARGETS = ("backend/", "main.py", "scripts/")
 
+# (name, command) for each check. They only read the tree, so they can run
+# side by side.
+CHECKS = [
+    (
+        "Ruff formatting check",
+        [*PYTHON_M, "ruff", "format", "--check", *TARGETS],
+    ),
+    # Lint rules include import sorting (isort's "I" rules)
+    ("Ruff linting", [*PYTHON_M, "ruff", "check", *TARGETS]),
+    # The mypy daemon stays resident after the first run and only rechecks
+    # what changed; stop it with `python -m mypy.dmypy stop`
+    (
+        "MyPy type checking",
+        [*PYTHON_M, "mypy.dmypy", "run", "--", *TARGETS],
+    ),
+    # pytest is the only test runner (test modules have no __main__ entry
+    # point); run a single test with `uv run pytest path::Class::test`.
+    # Tests share no state across modules, so shard whole files over workers
+    (
+        "Tests",
+        [*PYTHON_M, "pytest", "backend/tests/", "-v", "-n", "auto", "--dist=loadfile"],
+    ),
+]
+
+
+# Checks still in flight, so --fail-fast can stop them; guarded by _lock
+_running: set[subprocess.Popen[str]] = set()
+_lock = threading.Lock()
+_stopping = threading.Event()
 
-def main() -> int:
-    """Run all quality checks."""
-    print("Running code quality checks...")
-    exit_code = 0
 
-    # Check formatting
-    print("\nChecking code formatting...")
-    black_check = run_command(
-        ["uv", "run", "black", "--check", "backend/", "main.py", "scripts/"]
+def run_command(command: list[str]) -> tuple[int, str]:
+    """Run a command, collecting its output, and return (exit code, output)."""
+    output = io.StringIO()
+    with _lock:
+        if _stopping.is_set():
+            return -1, ""
+        # stderr is folded into stdout so warnings stay next to the lines
+        # they belong to, and lines are drained as the tool writes them
+        proc = subprocess.Popen(
+            command,
+            cwd=Path(__file__).parent.parent,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        _running.add(proc)
+    with proc:
+        assert proc.stdout is not None
+        for line in proc.stdout:
+            output.write(line)
+    with _lock:
+        _running.discard(proc)
+    return proc.returncode, output.getvalue()
+
+
+def _stop_running() -> None:
+    """Terminate the checks still in flight and keep new ones from starting."""
+    with _lock:
+        _stopping.set()
+        for proc in _running:
+            proc.terminate()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Run all quality checks.")
+    parser.add_argument(
+        "--fail-fast",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("CI") == "true",
+        help="stop the remaining checks after the first failure (default: on in CI)",
     )
-    isort_check = run_command(
-        ["uv", "run", "isort", "--check-only", "backend/", "main.py", "scripts/"]
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="skip tests marked integration",
     )
+    return parser.parse_args(argv)
 
-    if black_check != 0:
-        exit_code = black_check
-        print("[FAIL] Black formatting check failed")
-    else:
-        print("[PASS] Black formatting check passed")
 
-    if isort_check != 0:
-        exit_code = isort_check
-        print("[FAIL] isort import sorting check failed")
-    else:
-        print("[PASS] isort import sorting check passed")
+def main(argv: list[str] | None = None) -> int:
+    """Run all quality checks."""
+    args = parse_args(argv)
+    print("Running code quality checks...")
+    exit_code = 0
 
-    # Run linting
-    print("\nRunning linting checks...")
-    flake8_result = run_command(
-        ["uv", "run", "flake8", "backend/", "main.py", "scripts/"]
-    )
-    if flake8_result != 0:
-        exit_code = flake8_result
-        print("[FAIL] Flake8 linting failed")
-    else:
-        print("[PASS] Flake8 linting passed")
-
-    # Run type checking
-    print("\nRunning type checking...")
-    mypy_result = run_command(["uv", "run", "mypy", "backend/", "main.py", "scripts/"])
-    if mypy_result != 0:
-        exit_code = mypy_result
-        print("[FAIL] MyPy type checking failed")
-    else:
-        print("[PASS] MyPy type checking passed")
-
-    # Run tests
-    print("\nRunning tests...")
-    test_result = run_command(["uv", "run", "pytest", "backend/tests/", "-v"])
-    if test_result != 0:
-        exit_code = test_result
-        print("[FAIL] Tests failed")
-    else:
-        print("[PASS] Tests passed")
+    checks = CHECKS
+    if args.quick:
+        checks = [
+            (name, [*command, "-m", "not integration"] if name == "Tests" else command)
+            for name, command in CHECKS
+        ]
+
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {
+            executor.submit(run_command, command): (name, command)
+            for name, command in checks
+        }
+        for future in as_completed(futures):
+            name, command = futures[future]
+            returncode, output = future.result()
+
+            # Output was buffered, so each check prints as one uninterrupted block
+            print(f"\nRunning: {' '.join(command)}")
+            sys.stdout.write(output)
+            if returncode != 0:
+                exit_code = returncode
+                print(f"[FAIL] {name} failed")
+                if args.fail_fast:
+                    print("\nStopping the remaining checks (--fail-fast)")
+                    _stop_running()
+                    break
+            else:
+                print(f"[PASS] {name} passed")
 
     if exit_code == 0:
         print("\nAll quality checks passed!")
@@ -1,36 +1,102 @@
 #!/usr/bin/env python3
-"""Script to format code using black and isort."""
+"""Script to format code using ruff."""
 
+import json
+import os
 import subprocess
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).parent.parent
+
+# Run via `uv run python scripts/...`, so the tools are already installed in
+# this interpreter's environment; invoking them through it avoids a nested
+# `uv run` (environment check plus another interpreter start) per tool
+PYTHON_M = [sys.executable, "-m"]
+
+# Paths every tool runs over
+TARGETS = ("backend/", "main.py", "scripts/")
+
+# mtime_ns of every file as of the last clean run, so unchanged files are
+# not handed to the formatters again
+STAMP_FILE = ROOT / ".cache" / "format-stamps.json"
+# Holds the ruff settings; touching it invalidates every stamp
+CONFIG_FILE = "pyproject.toml"
+
 
 def run_command(command: list[str]) -> int:
     """Run a command and return its exit code."""
     print(f"Running: {' '.join(command)}")
-    result = subprocess.run(command, cwd=Path(__file__).parent.parent)
+    result = subprocess.run(command, cwd=ROOT)
     return result.returncode
 
 
+def _python_files(roots: tuple[str, ...]) -> list[str]:
+    """Expand files and directories under ROOT into their .py files."""
+    files = []
+    for root in roots:
+        path = ROOT / root
+        if path.is_file():
+            files.append(root)
+        else:
+            files.extend(str(p.relative_to(ROOT)) for p in sorted(path.rglob("*.py")))
+    return files
+
+
+def _stamps(files: list[str]) -> dict[str, int]:
+    """Current mtime_ns of each file, plus the formatter config."""
+    return {f: os.stat(ROOT / f).st_mtime_ns for f in [CONFIG_FILE, *files]}
+
+
+def _changed_files(files: list[str]) -> list[str]:
+    """Return the files modified since the last clean run."""
+    try:
+        cached = json.loads(STAMP_FILE.read_text())
+    except (OSError, ValueError):
+        # Cold start or unreadable cache: format everything
+        return files
+
+    current = _stamps(files)
+    if current[CONFIG_FILE] != cached.get(CONFIG_FILE):
+        return files
+    return [f for f in files if current[f] != cached.get(f)]
+
+
+def _save_stamps(files: list[str]) -> None:
+    """Record the files' mtimes after formatting, replacing the cache atomically."""
+    STAMP_FILE.parent.mkdir(exist_ok=True)
+    tmp = STAMP_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(_stamps(files)))
+    os.replace(tmp, STAMP_FILE)
+
+
 def main() -> int:
-    """Format code using black and isort."""
+    """Sort imports and format code using ruff."""
     exit_code = 0
 
-    # Run black
-    black_result = run_command(
-        ["uv", "run", "black", "backend/", "main.py", "scripts/"]
-    )
-    if black_result != 0:
-        exit_code = black_result
+    files = _python_files(TARGETS)
+    changed = _changed_files(files)
+    if not changed:
+        print("No files changed since the last run; nothing to format.")
+        return exit_code
 
-    # Run isort
+    # Sort imports first, so the formatter sees the final import blocks
     isort_result = run_command(
-        ["uv", "run", "isort", "backend/", "main.py", "scripts/"]
+        [*PYTHON_M, "ruff", "check", "--select", "I", "--fix", *changed]
     )
     if isort_result != 0:
         exit_code = isort_result
 
+    # Run the formatter
+    format_result = run_command([*PYTHON_M, "ruff", "format", *changed])
+    if format_result != 0:
+        exit_code = format_result
+
+    # Stamps are taken after formatting, so the formatters' own rewrites do
+    # not count as changes next time; a failed run keeps the old stamps
+    if exit_code == 0:
+        _save_stamps(files)
+
     return exit_code
 
 